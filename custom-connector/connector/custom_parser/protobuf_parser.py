@@ -13,16 +13,20 @@
 Utils module to parse the protobuf schema
 """
 
-import glob
-import importlib
-import shutil
-import sys
+import hashlib
+import importlib.metadata
+import os
+import re
+import tempfile
 import traceback
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Type, Union
+from typing import Dict, List, Optional, Set, Tuple, Type, Union
 
 import grpc_tools.protoc
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+from google.protobuf.descriptor import Descriptor
 from metadata.generated.schema.entity.data.table import Column, DataType
 from metadata.generated.schema.type.schema import DataTypeTopic, FieldModel
 from metadata.utils.helpers import snake_to_camel
@@ -31,6 +35,91 @@ from pydantic import BaseModel
 
 logger = ingestion_logger()
 
+# Levels of nested fields converted before truncating the tree
+DEFAULT_MAX_DEPTH = 32
+
+# Message classes kept in memory by the process, each one with its pool
+MESSAGE_CLASS_CACHE_SIZE = 64
+
+PROTO_IMPORT_PATTERN = re.compile(
+    r'^\s*import\s+(?:public\s+|weak\s+)?"([^"]+)"\s*;', re.MULTILINE
+)
+
+
+@lru_cache(maxsize=1)
+def get_protoc_version() -> str:
+    """
+    Version of the bundled protoc and of the protobuf runtime, since both
+    change the generated code
+    """
+    versions = []
+    for package in ("grpcio-tools", "protobuf"):
+        try:
+            versions.append(f"{package}=={importlib.metadata.version(package)}")
+        except importlib.metadata.PackageNotFoundError:
+            versions.append(f"{package}==unknown")
+    return ";".join(versions)
+
+
+def get_well_known_protos_dir() -> str:
+    """
+    google/protobuf/*.proto shipped with grpc_tools, which `python -m grpc_tools.protoc`
+    adds to the proto path but grpc_tools.protoc.main does not
+    """
+    return str(Path(grpc_tools.__file__).parent / "_proto")
+
+
+def hash_proto_dependencies(
+    interface_dir: Union[str, Path],
+    file_path: Union[str, Path],
+    parsed: Optional[Dict[Path, Tuple[bytes, List[Path]]]] = None,
+) -> Tuple[str, List[Path]]:
+    """
+    Hash the proto file, its transitive imports found under the interface
+    directory and the protoc version. Returns the hash and the imported
+    files, relative to the interface directory, starting with `file_path`.
+    Imports that are not there, e.g., google/protobuf/*.proto, are shipped
+    with protoc and only hashed by name. `parsed` keeps the content hash and
+    the imports of the files read, to share them between calls.
+    """
+    interface_dir = Path(interface_dir)
+    parsed = {} if parsed is None else parsed
+    digest = hashlib.sha256(get_protoc_version().encode("utf-8"))
+    path = Path(file_path)
+    if path.is_absolute():
+        path = path.resolve().relative_to(interface_dir.resolve())
+
+    files: List[Path] = []
+    pending = [path]
+    seen = set()
+    while pending:
+        path = pending.pop(0)
+        if path in seen:
+            continue
+        seen.add(path)
+        digest.update(path.as_posix().encode("utf-8"))
+
+        if path not in parsed:
+            full_path = interface_dir / path
+            if not full_path.exists():
+                continue
+            content = full_path.read_bytes()
+            parsed[path] = (
+                hashlib.sha256(content).digest(),
+                [
+                    Path(imported)
+                    for imported in PROTO_IMPORT_PATTERN.findall(
+                        content.decode("utf-8", errors="ignore")
+                    )
+                ],
+            )
+        content_hash, imports = parsed[path]
+        digest.update(content_hash)
+        files.append(path)
+        pending.extend(imports)
+
+    return digest.hexdigest(), files
+
 
 class ProtobufDataTypes(Enum):
     """
@@ -77,12 +166,196 @@ class ProtobufParserConfig(BaseModel):
     :param base_file_path: A temporary directory will be created under this path for
       generating the files required for protobuf parsing and compiling. By default
       the directory will be created under "/tmp/protobuf_openmetadata" unless it is
-      specified in the parameter.
+      specified in the parameter. The descriptor sets built by protoc are cached under
+      its "compiled" directory, by the hash of the proto files and the protoc version.
+    :param max_depth: Levels of nested fields converted before truncating the tree
     """
 
     schema_name: str
     schema_text: str
     base_file_path: Optional[str] = "/tmp/protobuf_openmetadata"
+    max_depth: int = DEFAULT_MAX_DEPTH
+
+
+def run_protoc_descriptor_set(
+    proto_files: List[str], proto_path: str, descriptor_set_out: str
+) -> int:
+    """
+    Write the FileDescriptorSet of the proto files and all their imports,
+    without generating any code
+    """
+    return grpc_tools.protoc.main(
+        [
+            "protoc",
+            f"--proto_path={proto_path}",
+            f"--proto_path={get_well_known_protos_dir()}",
+            f"--descriptor_set_out={descriptor_set_out}",
+            "--include_imports",
+            *proto_files,
+        ]
+    )
+
+
+def read_descriptor_set(path: Union[str, Path]) -> descriptor_pb2.FileDescriptorSet:
+    descriptor_set = descriptor_pb2.FileDescriptorSet()
+    descriptor_set.ParseFromString(Path(path).read_bytes())
+    return descriptor_set
+
+
+def build_descriptor_pool(
+    descriptor_set: descriptor_pb2.FileDescriptorSet,
+) -> descriptor_pool.DescriptorPool:
+    """
+    Load the descriptors in a pool of their own, instead of the default pool
+    the generated modules register into, so it is released with them.
+    protoc lists the imported files first.
+    """
+    pool = descriptor_pool.DescriptorPool()
+    added = set()
+    for file_proto in descriptor_set.file:
+        if file_proto.name not in added:
+            pool.AddSerializedFile(file_proto.SerializeToString())
+            added.add(file_proto.name)
+    return pool
+
+
+def find_message_descriptor(
+    pool: descriptor_pool.DescriptorPool, file_name: str, schema_name: str
+) -> Descriptor:
+    """
+    Descriptor of the schema's message, e.g., PersonInfo for person_info,
+    in the package of its file
+    """
+    package = pool.FindFileByName(file_name).package
+    message_name = snake_to_camel(schema_name)
+    return pool.FindMessageTypeByName(
+        f"{package}.{message_name}" if package else message_name
+    )
+
+
+@lru_cache(maxsize=MESSAGE_CLASS_CACHE_SIZE)
+def build_message_class(descriptor_set_path: str, file_name: str, schema_name: str):
+    """
+    Message class of the schema in its own descriptor pool. The descriptor
+    set is named after the hash of its proto files, so a schema that
+    changes gets a new class, and the least recently used ones are released
+    with their pools.
+    """
+    pool = build_descriptor_pool(read_descriptor_set(descriptor_set_path))
+    return message_factory.GetMessageClass(
+        find_message_descriptor(pool, file_name, schema_name)
+    )
+
+
+class ProtobufFieldConverter:
+    """
+    Converts message fields into FieldModel or Column trees.
+
+    Each message type is converted once, by full name, and its children are
+    shared by every field of that type. A field whose type is already being
+    converted above it, i.e., a recursive message, becomes a RECORD without
+    children, and so does a message field past `max_depth` levels.
+    """
+
+    def __init__(
+        self, cls: Type[BaseModel] = FieldModel, max_depth: int = DEFAULT_MAX_DEPTH
+    ):
+        self.cls = cls
+        self.max_depth = max_depth
+        # Full name -> (children, height) of the messages converted in full
+        self._converted: Dict[str, Tuple[List[BaseModel], int]] = {}
+        # (full name, depth) -> children of the messages cut by the depth limit
+        self._truncated: Dict[Tuple[str, int], List[BaseModel]] = {}
+        self._in_progress: List[str] = []
+
+    def convert_message(
+        self, message, depth: int = 1
+    ) -> Tuple[Optional[List[BaseModel]], int, Set[str], bool, Optional[str]]:
+        """
+        Convert the fields of a message whose fields sit at `depth`. Returns
+        the fields, the height of their tree, the messages above it they
+        refer back to, whether the depth limit cut it, and the description of
+        a truncated node.
+        """
+        name = message.full_name
+        if name in self._in_progress:
+            return None, 0, {name}, False, f"Recursive reference to {name}"
+
+        converted = self._converted.get(name)
+        if converted and depth + converted[1] - 1 <= self.max_depth:
+            return converted[0], converted[1], set(), False, None
+        if (name, depth) in self._truncated:
+            children = self._truncated[(name, depth)]
+            return children, self.max_depth - depth + 1, set(), True, None
+
+        if depth > self.max_depth:
+            return None, 0, set(), True, f"Truncated at depth {self.max_depth}"
+
+        self._in_progress.append(name)
+        try:
+            children, height, references, truncated = self.convert_fields(
+                message.fields, depth
+            )
+        finally:
+            self._in_progress.pop()
+
+        # Only the trees that don't depend on where they were found are reused
+        references.discard(name)
+        if not references and not truncated:
+            self._converted[name] = (children, height)
+        elif not references:
+            self._truncated[(name, depth)] = children
+        return children, height, references, truncated, None
+
+    def convert_fields(
+        self, fields, depth: int = 1
+    ) -> Tuple[List[BaseModel], int, Set[str], bool]:
+        """
+        Convert fields sitting at `depth`, see `convert_message`
+        """
+        field_models = []
+        height = 0
+        references: Set[str] = set()
+        truncated = False
+
+        for field in fields:
+            try:
+                children = None
+                description = None
+                if field.type == 11:
+                    (
+                        children,
+                        children_height,
+                        children_references,
+                        children_truncated,
+                        description,
+                    ) = self.convert_message(field.message_type, depth + 1)
+                    height = max(height, children_height)
+                    references |= children_references
+                    truncated = truncated or children_truncated
+
+                field_models.append(
+                    self.cls(
+                        name=field.name,
+                        dataType=ProtobufParser._get_field_type(
+                            field.type, cls=self.cls
+                        ),
+                        children=children,
+                        description=description,
+                    )
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.debug(traceback.format_exc())
+                logger.warning(
+                    f"Unable to parse the protobuf schema into models: {exc}"
+                )
+
+        return (
+            field_models,
+            height + 1 if field_models else 0,
+            references,
+            truncated,
+        )
 
 
 class ProtobufParser:
@@ -96,6 +369,7 @@ class ProtobufParser:
         self.config = config
         self.proto_interface_dir = f"{self.config.base_file_path}/interfaces"
         self.generated_src_dir = f"{self.config.base_file_path}/generated/"
+        self.compile_cache_dir = f"{self.config.base_file_path}/compiled"
 
     def load_module(self, module):
         """
@@ -104,34 +378,34 @@ class ProtobufParser:
         module_path = module
         return __import__(module_path, fromlist=[module])
 
+    def get_proto_dependencies(self, file_path: str) -> Tuple[str, List[Path]]:
+        """
+        Hash of the proto file, its imports and the protoc version, and the
+        imported files, starting with `file_path`
+        """
+        return hash_proto_dependencies(self.proto_interface_dir, file_path)
+
     def get_protobuf_python_object(self, file_path: str):
         """
-        Method to create protobuf python module and get object
+        Method to create protobuf python object.
+
+        The message class is built from the FileDescriptorSet of the proto
+        file and its imports, cached on disk by their hash and the protoc
+        version, so protoc only runs once per distinct schema. Each schema
+        gets a descriptor pool of its own rather than the default pool the
+        generated modules register into, so a schema that changes within
+        the process does not clash with its previous version, and sys.path
+        is left as it is. Only the most recently used classes are kept.
         """
         try:
-            # compile the .proto file and create python class
-            grpc_tools.protoc.main(
-                [
-                    "protoc",
-                    file_path,
-                    f"--proto_path={self.proto_interface_dir}",
-                    f"--python_out={self.generated_src_dir}",
-                ]
+            key, files = self.get_proto_dependencies(file_path)
+            class_ = build_message_class(
+                str(self.get_descriptor_set_path(key, files)),
+                files[0].as_posix(),
+                self.config.schema_name,
             )
 
-            # import the python file
-            sys.path.append(self.generated_src_dir)
-            generated_src_dir_path = Path(self.generated_src_dir)
-            py_file = glob.glob(
-                str(
-                    generated_src_dir_path.joinpath(f"{self.config.schema_name}_pb2.py")
-                )
-            )[0]
-            module_name = Path(py_file).stem
-            message = importlib.import_module(module_name)
-
-            # get the class and create a object instance
-            class_ = getattr(message, snake_to_camel(self.config.schema_name))
+            # create a object instance of the class
             instance = class_()
             return instance
         except Exception as exc:  # pylint: disable=broad-except
@@ -141,22 +415,115 @@ class ProtobufParser:
             )
         return None
 
+    def get_descriptor_set_path(self, key: str, files: List[Path]) -> Path:
+        """
+        File of the FileDescriptorSet of the proto files and their imports,
+        cached on disk by their hash
+        """
+        output_file = Path(self.compile_cache_dir) / f"{key}.pb"
+        if not output_file.exists():
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(
+                dir=output_file.parent, prefix=f".{key}-", suffix=".pb"
+            )
+            os.close(fd)
+            try:
+                return_code = run_protoc_descriptor_set(
+                    [file.as_posix() for file in files],
+                    self.proto_interface_dir,
+                    tmp_file,
+                )
+                if return_code != 0:
+                    raise RuntimeError(f"protoc failed with exit code {return_code}")
+                os.replace(tmp_file, output_file)
+            finally:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+        return output_file
+
+    def get_descriptor_set(
+        self, key: str, files: List[Path]
+    ) -> descriptor_pb2.FileDescriptorSet:
+        """
+        FileDescriptorSet of the proto files and their imports
+        """
+        return read_descriptor_set(self.get_descriptor_set_path(key, files))
+
+    def get_protobuf_descriptor(self, file_path: str) -> Optional[Descriptor]:
+        """
+        Descriptor of the schema's message, read from the FileDescriptorSet
+        built by protoc. Nothing is generated nor imported, and sys.path is
+        left as it is.
+        """
+        try:
+            key, files = self.get_proto_dependencies(file_path)
+            pool = build_descriptor_pool(self.get_descriptor_set(key, files))
+            return find_message_descriptor(
+                pool, files[0].as_posix(), self.config.schema_name
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.debug(traceback.format_exc())
+            logger.warning(
+                f"Unable to read the protobuf descriptors of {self.config.schema_name}: {exc}"
+            )
+        return None
+
+    def parse_schema_text(
+        self, cls: Type[BaseModel] = FieldModel
+    ) -> Optional[List[Union[FieldModel, Column]]]:
+        """
+        Parse the schema text of the config from its descriptors
+        """
+        file_path = Path(self.proto_interface_dir) / f"{self.config.schema_name}.proto"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(self.config.schema_text, encoding="utf-8")
+
+        descriptor = self.get_protobuf_descriptor(file_path.name)
+        if descriptor is None:
+            return None
+        return self.parse_protobuf_descriptor(
+            descriptor,
+            self.config.schema_name,
+            cls=cls,
+            max_depth=self.config.max_depth,
+        )
+
     @staticmethod
     def parse_protobuf_schema(
-        instance, schema_name, cls: Type[BaseModel] = FieldModel
+        instance,
+        schema_name,
+        cls: Type[BaseModel] = FieldModel,
+        max_depth: int = DEFAULT_MAX_DEPTH,
     ) -> Optional[List[Union[FieldModel, Column]]]:
         """
-        Method to parse the protobuf schema
+        Method to parse the protobuf schema. A missing instance is logged by
+        parse_protobuf_descriptor, like any other parsing error.
+        """
+        return ProtobufParser.parse_protobuf_descriptor(
+            getattr(instance, "DESCRIPTOR", None),
+            schema_name,
+            cls=cls,
+            max_depth=max_depth,
+        )
+
+    @staticmethod
+    def parse_protobuf_descriptor(
+        descriptor: Descriptor,
+        schema_name,
+        cls: Type[BaseModel] = FieldModel,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+    ) -> Optional[List[Union[FieldModel, Column]]]:
+        """
+        Method to parse the descriptor of a protobuf message
         """
 
         try:
+            converter = ProtobufFieldConverter(cls=cls, max_depth=max_depth)
             field_models = [
                 cls(
-                    name=instance.DESCRIPTOR.name,
+                    name=descriptor.name,
                     dataType="RECORD",
-                    children=ProtobufParser.get_protobuf_fields(
-                        instance.DESCRIPTOR.fields, cls=cls
-                    ),
+                    children=converter.convert_message(descriptor)[0],
                 )
             ]
 
@@ -177,30 +544,11 @@ class ProtobufParser:
 
     @staticmethod
     def get_protobuf_fields(
-        fields, cls: Type[BaseModel] = FieldModel
+        fields, cls: Type[BaseModel] = FieldModel, max_depth: int = DEFAULT_MAX_DEPTH
     ) -> Optional[List[Union[FieldModel, Column]]]:
         """
-        Recursively convert the parsed schema into required models
+        Recursively convert the parsed schema into required models, converting
+        each message type only once
         """
-        field_models = []
-
-        for field in fields:
-            try:
-                field_models.append(
-                    cls(
-                        name=field.name,
-                        dataType=ProtobufParser._get_field_type(field.type, cls=cls),
-                        children=ProtobufParser.get_protobuf_fields(
-                            field.message_type.fields, cls=cls
-                        )
-                        if field.type == 11
-                        else None,
-                    )
-                )
-            except Exception as exc:  # pylint: disable=broad-except
-                logger.debug(traceback.format_exc())
-                logger.warning(
-                    f"Unable to parse the protobuf schema into models: {exc}"
-                )
-
-        return field_models
+        converter = ProtobufFieldConverter(cls=cls, max_depth=max_depth)
+        return converter.convert_fields(fields)[0]
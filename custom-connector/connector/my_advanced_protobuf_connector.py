@@ -13,20 +13,32 @@ Custom Database Service Extracting metadata from a Protobuf file
 """
 import glob
 import importlib
+import json
 import os
+import re
 import shutil
 import sys
 import traceback
+from concurrent.futures import ProcessPoolExecutor
 from distutils.dir_util import copy_tree
 from enum import Enum
 from pathlib import Path
-from typing import Iterable, List, Optional, Type, Union
+from typing import Callable, Dict, Iterable, List, Optional, Type, Union
 
-from connector.custom_parser.protobuf_parser import ProtobufParser 
+import grpc_tools.protoc
+from connector.custom_parser.protobuf_parser import (
+    DEFAULT_MAX_DEPTH,
+    ProtobufParser,
+    build_descriptor_pool,
+    find_message_descriptor,
+    get_well_known_protos_dir,
+    hash_proto_dependencies,
+    read_descriptor_set,
+    run_protoc_descriptor_set,
+)
+from google.protobuf import descriptor_pb2
 from metadata.utils.helpers import snake_to_camel
 
-import subprocess
-
 from metadata.generated.schema.api.data.createDatabase import CreateDatabaseRequest
 from metadata.generated.schema.api.data.createDatabaseSchema import (
     CreateDatabaseSchemaRequest,
@@ -56,6 +68,32 @@ from metadata.utils.logger import ingestion_logger
 
 logger = ingestion_logger()
 
+DESCRIPTION_PATTERN = re.compile(r'\[\(description\)\s*=\s*".*?"\]')
+
+# Parser modes: generate and import python modules, or only read the
+# descriptors written by protoc
+CODEGEN_MODE = "codegen"
+DESCRIPTOR_MODE = "descriptor"
+
+# Below this many changed protos, a single protoc run beats spawning processes
+MIN_PROTOS_PER_PROCESS = 200
+
+
+def run_protoc(proto_files: List[str], proto_path: str, python_out: str) -> int:
+    """
+    Compile the proto files with the protoc bundled in grpc_tools, in the
+    current process
+    """
+    return grpc_tools.protoc.main(
+        [
+            "protoc",
+            f"--proto_path={proto_path}",
+            f"--proto_path={get_well_known_protos_dir()}",
+            f"--python_out={python_out}",
+            *proto_files,
+        ]
+    )
+
 
 class InvalidProtobufConnectorException(Exception):
     """
@@ -106,14 +144,39 @@ class AdvancedProtobufConnector(Source):
                 "Missing business_unit connection option"
             )
 
-        self.data = None
+        # Processes compiling the protos when a lot of them changed
+        self.compile_workers: int = int(
+            self.service_connection.connectionOptions.root.get("compile_workers", 1)
+        )
+        # Hash of each proto when it was last compiled
+        self.hashes_path = Path(self.staging_directory).joinpath("proto_hashes.json")
+
+        self.parser_mode: str = self.service_connection.connectionOptions.root.get(
+            "parser_mode", CODEGEN_MODE
+        )
+        if self.parser_mode not in (CODEGEN_MODE, DESCRIPTOR_MODE):
+            raise InvalidProtobufConnectorException(
+                f"Unknown parser_mode {self.parser_mode}, expected"
+                f" {CODEGEN_MODE} or {DESCRIPTOR_MODE}"
+            )
+        self.descriptor_set_path = Path(self.staging_directory).joinpath(
+            "descriptors.pb"
+        )
+        # Levels of nested message fields turned into columns
+        self.max_depth: int = int(
+            self.service_connection.connectionOptions.root.get(
+                "max_depth", DEFAULT_MAX_DEPTH
+            )
+        )
 
         super().__init__()
 
     def prepare(self):
-        # Validate that the file exists
-        import re
-
+        """
+        Compile the protos that changed since the last run, all in one protoc
+        invocation, or split across `compile_workers` processes. In descriptor
+        mode, build a single FileDescriptorSet of all of them instead.
+        """
         try:
             proto_file_list = [
                 os.path.join(dirpath, f)
@@ -123,22 +186,153 @@ class AdvancedProtobufConnector(Source):
             ]
             for proto_file in proto_file_list:
                 with open(proto_file, "r", encoding="utf-8") as file:
-                    self.data = file.read()
-                    description_pattern = re.compile(r'\[\(description\)\s*=\s*".*?"\]')
-                    self.data = description_pattern.sub("", self.data)
-                    subprocess.run(
-                        [
-                            "protoc",
-                            proto_file,
-                            f"--proto_path={self.interface_path}",
-                            f"--python_out={self.generated_path}",
-                        ]
-                    )
+                    data = DESCRIPTION_PATTERN.sub("", file.read())
+                with open(proto_file, "w", encoding="utf-8") as file:
+                    file.write(data)
+
+            previous_hashes = self.load_hashes()
+            hashes = {}
+            changed = []
+            # Content hash and imports of each proto, read once for all of them
+            parsed = {}
+            for proto_file in proto_file_list:
+                relative_path = Path(proto_file).relative_to(self.interface_path)
+                key = relative_path.as_posix()
+                # A proto is compiled again when one of its imports changed too
+                hashes[key], _ = hash_proto_dependencies(
+                    self.interface_path, relative_path, parsed
+                )
+                if previous_hashes.get(key) != hashes[key] or not self.is_compiled(
+                    relative_path
+                ):
+                    changed.append(key)
+
+            if self.parser_mode == DESCRIPTOR_MODE:
+                failed = self.build_descriptor_set(list(hashes)) if changed else []
+            else:
+                logger.info(
+                    f"Compiling {len(changed)} of {len(proto_file_list)} proto files,"
+                    " the others did not change since the last run"
+                )
+                failed = self.compile_protos(changed)
+            self.save_hashes(
+                {key: value for key, value in hashes.items() if key not in failed}
+            )
 
         except Exception as exc:
             logger.error("Unknown error reading the source file")
             raise exc
 
+    def is_compiled(self, relative_path: Path) -> bool:
+        if self.parser_mode == DESCRIPTOR_MODE:
+            return self.descriptor_set_path.exists()
+        return self.generated_path.joinpath(
+            relative_path.with_name(f"{relative_path.stem}_pb2.py")
+        ).exists()
+
+    def load_hashes(self) -> Dict[str, str]:
+        if not self.hashes_path.exists():
+            return {}
+        with open(self.hashes_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def save_hashes(self, hashes: Dict[str, str]) -> None:
+        with open(self.hashes_path, "w", encoding="utf-8") as file:
+            json.dump(hashes, file)
+
+    def compile_protos(self, proto_files: List[str]) -> List[str]:
+        """
+        Compile the protos and return the ones that failed. A single bad
+        proto fails its whole protoc run, so we then bisect that run's
+        protos to find it.
+        """
+        if not proto_files:
+            return []
+
+        processes = min(
+            self.compile_workers, len(proto_files) // MIN_PROTOS_PER_PROCESS
+        )
+        if processes <= 1:
+            chunks = [proto_files]
+        else:
+            chunks = [proto_files[i::processes] for i in range(processes)]
+
+        args = (str(self.interface_path), str(self.generated_path))
+
+        def compile_(files: List[str]) -> int:
+            return run_protoc(files, *args)
+
+        if len(chunks) == 1:
+            return_codes = [run_protoc(chunks[0], *args)]
+        else:
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                return_codes = list(
+                    executor.map(
+                        run_protoc,
+                        chunks,
+                        [args[0]] * len(chunks),
+                        [args[1]] * len(chunks),
+                    )
+                )
+
+        failed = []
+        for chunk, return_code in zip(chunks, return_codes):
+            if return_code != 0:
+                failed += self.bisect_failed_protos(chunk, compile_)
+        return failed
+
+    def build_descriptor_set(self, proto_files: List[str]) -> List[str]:
+        """
+        Build a single FileDescriptorSet of all the protos and their imports,
+        leaving out the protos that do not compile, which are returned
+        """
+        logger.info(f"Building the descriptors of {len(proto_files)} proto files")
+        descriptor_set = descriptor_pb2.FileDescriptorSet()
+        added = set()
+        tmp_path = self.descriptor_set_path.with_suffix(".tmp")
+
+        def build(files: List[str]) -> int:
+            return_code = run_protoc_descriptor_set(
+                files, str(self.interface_path), str(tmp_path)
+            )
+            if return_code == 0:
+                # Files already added by another half come with the same imports
+                for file_proto in read_descriptor_set(tmp_path).file:
+                    if file_proto.name not in added:
+                        added.add(file_proto.name)
+                        descriptor_set.file.append(file_proto)
+            return return_code
+
+        try:
+            failed = (
+                self.bisect_failed_protos(proto_files, build)
+                if build(proto_files)
+                else []
+            )
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        self.descriptor_set_path.write_bytes(descriptor_set.SerializeToString())
+        return failed
+
+    def bisect_failed_protos(
+        self, proto_files: List[str], compile_: Callable[[List[str]], int]
+    ) -> List[str]:
+        """
+        Compile each half of a failed protoc run, until we are left with the
+        protos that fail on their own
+        """
+        if len(proto_files) == 1:
+            logger.error(f"Error compiling the proto file {proto_files[0]}")
+            return proto_files
+
+        failed = []
+        middle = len(proto_files) // 2
+        for half in (proto_files[:middle], proto_files[middle:]):
+            if compile_(half):
+                failed += self.bisect_failed_protos(half, compile_)
+        return failed
+
     @classmethod
     def create(
         cls,
@@ -195,6 +389,46 @@ class AdvancedProtobufConnector(Source):
             entity=DatabaseSchema,
             fqn=f"{self.config.serviceName}.{self.business_unit}.default",
         )
+        if self.parser_mode == DESCRIPTOR_MODE:
+            yield from self.yield_tables_from_descriptors(database_schema)
+        else:
+            yield from self.yield_tables_from_generated_code(database_schema)
+
+    def yield_tables_from_descriptors(self, database_schema: DatabaseSchema):
+        """
+        Create a table for the message named after each proto file, reading
+        the FileDescriptorSet built in prepare. Nothing is imported.
+        """
+        descriptor_set = read_descriptor_set(self.descriptor_set_path)
+        pool = build_descriptor_pool(descriptor_set)
+        for file_proto in descriptor_set.file:
+            if not self.interface_path.joinpath(file_proto.name).exists():
+                # Imports shipped with protoc, e.g., google/protobuf/timestamp.proto
+                continue
+            try:
+                schema_name = Path(file_proto.name).stem
+                descriptor = find_message_descriptor(pool, file_proto.name, schema_name)
+                columns = (
+                    ProtobufParser.parse_protobuf_descriptor(
+                        descriptor, schema_name, cls=Column, max_depth=self.max_depth
+                    )
+                    or []
+                )
+                yield Either(
+                    right=CreateTableRequest(
+                        name=schema_name,
+                        databaseSchema=database_schema.fullyQualifiedName,
+                        columns=columns,
+                    )
+                )
+            except Exception as exc:
+                logger.error(f"Error reading the descriptors of {file_proto.name}: {exc}")
+                logger.debug(traceback.format_exc())
+
+    def yield_tables_from_generated_code(self, database_schema: DatabaseSchema):
+        """
+        Create a table for each generated python module
+        """
         sys.path.append(str(self.generated_path))
         python_file_list = [
             os.path.join(dirpath, f)
@@ -212,7 +446,12 @@ class AdvancedProtobufConnector(Source):
                 # get the class and create a object instance
                 class_ = getattr(message, snake_to_camel(schema_name))
                 instance = class_()
-                columns = ProtobufParser.parse_protobuf_schema(instance, schema_name, cls=Column) or []
+                columns = (
+                    ProtobufParser.parse_protobuf_schema(
+                        instance, schema_name, cls=Column, max_depth=self.max_depth
+                    )
+                    or []
+                )
                 yield Either(
                     right=CreateTableRequest(
                         name=schema_name,
@@ -13,7 +13,9 @@ Custom Database Service Extracting metadata from a Protobuf file
 """
 import traceback
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Optional
+
+from connector.custom_parser import protobuf_parser as descriptor_parser
 
 from metadata.generated.schema.api.data.createDatabase import CreateDatabaseRequest
 from metadata.generated.schema.api.data.createDatabaseSchema import (
@@ -88,6 +90,12 @@ class ProtobufConnector(Source):
                 "Missing schema_name connection option"
             )
 
+        # "descriptor" reads the schema from the descriptors written by
+        # protoc, without generating nor importing any python code
+        self.parser_mode: str = self.service_connection.connectionOptions.__root__.get(
+            "parser_mode", "codegen"
+        )
+
         self.data = None
 
         super().__init__()
@@ -171,12 +179,20 @@ class ProtobufConnector(Source):
             )
 
         if self.data:
-            protobuf_parser = ProtobufParser(
-                config=ProtobufParserConfig(
-                    schema_name=self.schema_name, schema_text=self.data
+            if self.parser_mode == "descriptor":
+                protobuf_parser = descriptor_parser.ProtobufParser(
+                    config=descriptor_parser.ProtobufParserConfig(
+                        schema_name=self.schema_name, schema_text=self.data
+                    )
                 )
-            )
-            columns = protobuf_parser.parse_protobuf_schema(cls=Column) or []
+                columns = protobuf_parser.parse_schema_text(cls=Column) or []
+            else:
+                protobuf_parser = ProtobufParser(
+                    config=ProtobufParserConfig(
+                        schema_name=self.schema_name, schema_text=self.data
+                    )
+                )
+                columns = protobuf_parser.parse_protobuf_schema(cls=Column) or []
             yield Either(
                 right=CreateTableRequest(
                     name=self.schema_name,
@@ -1,6 +1,23 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
 import traceback
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 import requests
 from metadata.generated.schema.entity.domains.domain import Domain
@@ -15,16 +32,229 @@ from metadata.ingestion.api.steps import Source
 from metadata.generated.schema.api.teams.createUser import CreateUserRequest
 from metadata.ingestion.ometa.ometa_api import OpenMetadata
 from metadata.ingestion.ometa.utils import model_str
+from metadata.utils import fqn
 from metadata.utils.logger import ingestion_logger
 
 logger = ingestion_logger()
 
+T = TypeVar("T")
+
+USER_FIELDS = ["email", "displayName", "domain"]
+
+
+def build_users_query(paginated: bool, updated_since: bool) -> str:
+    """GraphQL query of the users, with the arguments the connector needs"""
+    variables, arguments, fields = [], [], list(USER_FIELDS)
+    if paginated:
+        variables += ["$offset: Int!", "$limit: Int!"]
+        arguments += ["offset: $offset", "limit: $limit"]
+    if updated_since:
+        variables.append("$updatedSince: String")
+        arguments.append("updatedSince: $updatedSince")
+        fields.append("updatedAt")
+
+    signature = f"query Users({', '.join(variables)})" if variables else "query Users"
+    users = f"users({', '.join(arguments)})" if arguments else "users"
+    return f"{signature} {{ {users} {{ {' '.join(fields)} }} }}"
+
+
+# Marks the end of the pages in the prefetch queue
+END_OF_PAGES = object()
+
 
 @dataclass
 class UserUpdaterConfig:
     """Configuration for User Updater connector"""
 
     graphql_endpoint: str
+    # Seconds before an indexed user or domain is fetched again. No expiry if unset
+    index_ttl: Optional[float] = None
+    # Users per GraphQL request. 0 fetches all of them in a single query
+    page_size: int = 500
+    # Only process the users that changed since the last run
+    incremental: bool = False
+    state_file: str = "user_updater_state.json"
+    # Only ask the GraphQL server for the users updated since the last run
+    updated_since: bool = False
+    # Users upserted together by the connector. 0 sends them one by one to the
+    # sink, or upserts them one by one with incremental sync
+    batch_size: int = 0
+    # Upsert requests of a batch running at the same time
+    max_in_flight: int = 8
+
+
+def get_bool_option(options: dict, key: str) -> bool:
+    """connectionOptions values are strings"""
+    return str(options.get(key, "false")).lower() in ("true", "1", "yes")
+
+
+class UserSyncState:
+    """
+    Last-seen fingerprint of the (email, displayName, domain) of each
+    GraphQL user, and the watermark of the last complete fetch, kept in a
+    JSON file between runs
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fingerprints: Dict[str, str] = {}
+        self.watermark: Optional[str] = None
+        # updatedAt of the oldest user that could not be synced in this run
+        self.oldest_failure: Optional[str] = None
+        self.failed_without_date = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(user_data: dict) -> str:
+        values = [user_data["email"].lower()] + [
+            user_data.get(field) for field in USER_FIELDS[1:]
+        ]
+        return hashlib.sha1(json.dumps(values).encode("utf-8")).hexdigest()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            logger.info(f"No state found at {self.path}, processing every user")
+            return
+        with open(self.path, encoding="utf-8") as file:
+            state = json.load(file)
+        self.fingerprints = state.get("fingerprints", {})
+        self.watermark = state.get("watermark")
+        logger.info(
+            f"Loaded {len(self.fingerprints)} user fingerprints from {self.path},"
+            f" watermark {self.watermark}"
+        )
+
+    def is_unchanged(self, user_data: dict) -> bool:
+        key = user_data["email"].lower()
+        return self.fingerprints.get(key) == self.fingerprint(user_data)
+
+    def record(self, user_data: dict) -> None:
+        with self._lock:
+            self.fingerprints[user_data["email"].lower()] = self.fingerprint(
+                user_data
+            )
+
+    def record_failure(self, user_data: dict) -> None:
+        """Keep the watermark from moving past a user that was not synced"""
+        updated_at = user_data.get("updatedAt")
+        with self._lock:
+            if not updated_at:
+                self.failed_without_date = True
+            elif self.oldest_failure is None or updated_at < self.oldest_failure:
+                self.oldest_failure = updated_at
+
+    def advance(self, watermark: Optional[str]) -> None:
+        """
+        Move the watermark to the latest user fetched, but not past the
+        oldest user that failed, so that the next run fetches it again
+        """
+        if not watermark or self.failed_without_date:
+            return
+        if self.oldest_failure:
+            watermark = min(watermark, self.oldest_failure)
+        self.watermark = watermark
+
+    def save(self) -> None:
+        """Write the state atomically, so an interrupted run keeps the last one"""
+        tmp_path = f"{self.path}.tmp"
+        with self._lock, open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"watermark": self.watermark, "fingerprints": self.fingerprints}, file
+            )
+        os.replace(tmp_path, self.path)
+
+
+class EntityIndex(Generic[T]):
+    """
+    Hash index of OpenMetadata entities by a case-insensitive key,
+    e.g., users by email or domains by name.
+
+    With a `ttl`, entries older than `ttl` seconds are fetched again by id
+    when they are looked up, so a long-running process only refreshes the
+    entities it uses. A key missing from an index older than `ttl` is
+    fetched on its own with `lookup`, to pick up the entities created since,
+    and then not looked up again for `ttl` seconds if it still is missing.
+    """
+
+    def __init__(
+        self,
+        metadata: OpenMetadata,
+        entity: Type[T],
+        key: Callable[[T], Optional[str]],
+        fields: Optional[List[str]] = None,
+        ttl: Optional[float] = None,
+        lookup: Optional[Callable[[str], Optional[T]]] = None,
+    ):
+        self.metadata = metadata
+        self.entity = entity
+        self.key = key
+        self.fields = fields
+        self.ttl = ttl
+        self.lookup = lookup
+        self.loaded_at = 0.0
+        self._entries: Dict[str, Tuple[T, float]] = {}
+        # Keys looked up and not found, and when
+        self._missing: Dict[str, float] = {}
+
+    def load(self) -> None:
+        """Build the index from the full listing"""
+        now = time.monotonic()
+        entries = {}
+        for entity in self.metadata.list_all_entities(
+            entity=self.entity, fields=self.fields
+        ):
+            key = self.key(entity)
+            if key:
+                entries[key.lower()] = (entity, now)
+        self._entries = entries
+        self._missing = {}
+        self.loaded_at = now
+        logger.info(f"Indexed {len(entries)} {self.entity.__name__} entities")
+
+    def _expired(self, timestamp: float) -> bool:
+        return self.ttl is not None and time.monotonic() - timestamp > self.ttl
+
+    def get(self, key: str) -> Optional[T]:
+        """Entity for the key, refreshed if its entry expired"""
+        index_key = key.lower()
+        entry = self._entries.get(index_key)
+        if entry is None:
+            return self._get_missing(key)
+
+        entity, fetched_at = entry
+        if not self._expired(fetched_at):
+            return entity
+
+        entity = self.metadata.get_by_id(
+            entity=self.entity, entity_id=entity.id, fields=self.fields
+        )
+        if entity is None:
+            self._entries.pop(index_key, None)
+            return None
+        self._entries[index_key] = (entity, time.monotonic())
+        return entity
+
+    def _get_missing(self, key: str) -> Optional[T]:
+        """Fetch a key that is not indexed, if it may have been created since"""
+        index_key = key.lower()
+        if not self.lookup or not self._expired(
+            self._missing.get(index_key, self.loaded_at)
+        ):
+            return None
+
+        entity = self.lookup(key)
+        now = time.monotonic()
+        found_key = self.key(entity) if entity else None
+        if not found_key or found_key.lower() != index_key:
+            self._missing[index_key] = now
+            return None
+
+        self._missing.pop(index_key, None)
+        self._entries[index_key] = (entity, now)
+        return entity
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class UserUpdaterSource(Source):
@@ -34,16 +264,36 @@ class UserUpdaterSource(Source):
     """
 
     def prepare(self):
-        self.domains = list(
-            self.metadata.list_all_entities(
-                entity=Domain,
-            )
+        if self.state:
+            self.state.load()
+        self.domains = EntityIndex(
+            self.metadata,
+            entity=Domain,
+            key=lambda domain: model_str(domain.name),
+            ttl=self.index_ttl,
+            lookup=lambda name: self.metadata.get_by_name(
+                entity=Domain, fqn=fqn.quote_name(name)
+            ),
         )
-        self.users = list(
-            self.metadata.list_all_entities(
-                entity=User,
-                fields=["*"]
-            )
+        self.domains.load()
+        self.users = EntityIndex(
+            self.metadata,
+            entity=User,
+            key=lambda user: model_str(user.email) if user.email else None,
+            fields=["*"],
+            ttl=self.index_ttl,
+            lookup=self.get_user_by_email,
+        )
+        self.users.load()
+
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        """Search a single user by email, as the ometa user mixin does"""
+        return self.metadata.get_entity_from_es(
+            entity=User,
+            query_string=self.metadata.email_search_query_es(entity=User).format(
+                email=email, from_=0, size=1
+            ),
+            fields=["*"],
         )
 
     def __init__(self, config: WorkflowSource, metadata: OpenMetadata):
@@ -56,6 +306,19 @@ class UserUpdaterSource(Source):
         self.graphql_endpoint = connection_options.root.get(
             "graphql_endpoint", "http://localhost:4000"
         )
+        index_ttl = connection_options.root.get("index_ttl")
+        self.index_ttl = float(index_ttl) if index_ttl else None
+        self.page_size = int(connection_options.root.get("page_size", 500))
+        self.updated_since = get_bool_option(connection_options.root, "updated_since")
+        self.batch_size = int(connection_options.root.get("batch_size", 0))
+        self.max_in_flight = int(connection_options.root.get("max_in_flight", 8))
+        self.state = (
+            UserSyncState(
+                connection_options.root.get("state_file", "user_updater_state.json")
+            )
+            if get_bool_option(connection_options.root, "incremental")
+            else None
+        )
 
         self.domains = None
         self.users = None
@@ -70,44 +333,99 @@ class UserUpdaterSource(Source):
         config: WorkflowSource = WorkflowSource.parse_obj(config_dict)
         return cls(config, metadata)
 
-    def _fetch_users_from_graphql(self):
-        """Fetch users from GraphQL server"""
-        query = """
-        {
-            users {
-                email
-                displayName
-                domain
-            }
-        }
+    def _post_graphql(self, query: str, variables: Optional[dict] = None) -> dict:
+        """Send a query to the GraphQL server and return its data"""
+        payload = {"query": query}
+        if variables:
+            payload["variables"] = variables
+        response = requests.post(
+            self.graphql_endpoint,
+            json=payload,
+            headers={"Content-Type": "application/json"},
+            timeout=30,
+        )
+        response.raise_for_status()
+        body = response.json()
+        if body.get("errors"):
+            raise ValueError(f"GraphQL errors: {body['errors']}")
+        return body.get("data") or {}
+
+    def _fetch_user_pages(
+        self, updated_since: Optional[str] = None
+    ) -> Iterable[List[dict]]:
+        """Fetch the users from the GraphQL server one page at a time"""
+        query = build_users_query(
+            paginated=bool(self.page_size), updated_since=self.updated_since
+        )
+        variables = {"updatedSince": updated_since} if self.updated_since else {}
+        if not self.page_size:
+            yield self._post_graphql(query, variables).get("users", [])
+            return
+
+        offset = 0
+        while True:
+            page = self._post_graphql(
+                query, {**variables, "offset": offset, "limit": self.page_size}
+            ).get("users", [])
+            if page:
+                yield page
+            if len(page) < self.page_size:
+                return
+            offset += len(page)
+
+    def _fetch_users_from_graphql(
+        self, updated_since: Optional[str] = None
+    ) -> Iterable[dict]:
+        """
+        Stream the users from the GraphQL server. The next page is fetched
+        in the background while the current one is processed, and at most
+        one page waits in memory.
         """
+        pages = queue.Queue(maxsize=1)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
 
+        def fetch():
+            try:
+                for page in self._fetch_user_pages(updated_since):
+                    if not put(page):
+                        return
+                put(END_OF_PAGES)
+            except Exception as e:
+                put(e)
+
+        fetcher = threading.Thread(target=fetch, name="graphql-fetch", daemon=True)
+        fetcher.start()
         try:
-            response = requests.post(
-                self.graphql_endpoint,
-                json={"query": query},
-                headers={"Content-Type": "application/json"},
-                timeout=30,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("data", {}).get("users", [])
-        except Exception as e:
-            logger.error(f"Failed to fetch users from GraphQL: {e}")
-            return []
+            while True:
+                page = pages.get()
+                if page is END_OF_PAGES:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                yield from page
+        finally:
+            stop.set()
 
     def _find_domain_by_name(self, domain_name: str) -> Optional[EntityReference]:
         """Find domain entity by name and return as EntityReference"""
         try:
-            # Try to find existing domain
-            for domain in self.domains:
-                if model_str(domain.name).lower() == domain_name.lower():
-                    return EntityReference(
-                        id=domain.id,
-                        type="domain",
-                        name=domain.name.root,
-                        fullyQualifiedName=domain.fullyQualifiedName.root,
-                    )
+            domain = self.domains.get(domain_name)
+            if domain:
+                return EntityReference(
+                    id=domain.id,
+                    type="domain",
+                    name=domain.name.root,
+                    fullyQualifiedName=domain.fullyQualifiedName.root,
+                )
         except Exception as e:
             logger.debug(f"Error searching for domain {domain_name}: {e}")
         return None
@@ -141,10 +459,7 @@ class UserUpdaterSource(Source):
             # Find existing user
             existing_user = None
             try:
-                for user in self.users:
-                    if model_str(user.email) == email:
-                        existing_user = user
-                        break
+                existing_user = self.users.get(email)
             except Exception as e:
                 logger.debug(f"Error searching for user {email}: {e}")
             
@@ -200,14 +515,71 @@ class UserUpdaterSource(Source):
 
     def _iter(self) -> Iterable[Either]:
         """
-        Main method that yields results for each user update
+        Main method that yields results for each user update. Users are
+        processed as their pages arrive from the GraphQL server.
         """
         logger.info("Starting User Updater connector")
 
-        # Fetch users from GraphQL
-        users = self._fetch_users_from_graphql()
+        updated_since = (
+            self.state.watermark if self.state and self.updated_since else None
+        )
+        if updated_since:
+            logger.info(f"Fetching the users updated since {updated_since}")
+
+        count = 0
+        skipped = 0
+        watermark = None
+        # The sink doesn't tell us whether its writes succeed, so with a
+        # state we write the users ourselves, and only record the ones
+        # OpenMetadata confirmed
+        batch_size = self.batch_size or (1 if self.state else 0)
+        batch: List[Tuple[dict, CreateUserRequest]] = []
+        with ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix="user-upsert"
+        ) as executor:
+            try:
+                for user_data in self._fetch_users_from_graphql(updated_since):
+                    count += 1
+                    updated_at = user_data.get("updatedAt")
+                    if updated_at and (watermark is None or updated_at > watermark):
+                        watermark = updated_at
+                    if self.state and self.state.is_unchanged(user_data):
+                        skipped += 1
+                        continue
+
+                    for result in self._process_user(user_data):
+                        if result.right is None:
+                            yield result
+                        elif batch_size:
+                            batch.append((user_data, result.right))
+                        else:
+                            yield result
+
+                    if batch_size and len(batch) >= batch_size:
+                        yield from self._upsert_users(executor, batch)
+                        batch = []
+            except Exception as e:
+                logger.error(f"Failed to fetch users from GraphQL: {e}")
+                yield from self._upsert_users(executor, batch)
+                if self.state:
+                    # Keep the users processed so far, but not the watermark
+                    self.state.save()
+                yield Either(
+                    left=StackTraceError(
+                        name="GraphQL Fetch Error",
+                        error=f"Failed to fetch users from GraphQL after {count} users: {e}",
+                        stackTrace=traceback.format_exc(),
+                    )
+                )
+                return
+
+            yield from self._upsert_users(executor, batch)
+
+        if not count and updated_since:
+            logger.info(f"No users updated since {updated_since}")
+            return
 
-        if not users:
+        if not count:
             yield Either(
                 left=StackTraceError(
                     name="GraphQL Fetch Error",
@@ -217,48 +589,105 @@ class UserUpdaterSource(Source):
             )
             return
 
-        logger.info(f"Found {len(users)} users from GraphQL")
+        logger.info(
+            f"Processed {count - skipped} users from GraphQL,"
+            f" {skipped} unchanged since the last run"
+        )
+        if self.state:
+            self.state.advance(watermark)
+            self.state.save()
 
-        # Process each user
-        for user_data in users:
-            try:
-                result = self._update_user_entity(user_data)
+    def _upsert_users(
+        self, executor: Executor, batch: List[Tuple[dict, CreateUserRequest]]
+    ) -> Iterable[Either]:
+        """
+        Create or update a batch of users, with up to max_in_flight requests
+        at a time. Failures are yielded as the sink would report them.
+        """
+        if not batch:
+            return
 
-                # If result is a CreateUserRequest, yield it as right
-                if isinstance(result, CreateUserRequest):
-                    yield Either(right=result)
-                else:
-                    # Handle different types of string messages
-                    result_str = str(result)
-                    if "already up to date" in result_str:
-                        # Just log up-to-date users, don't yield as error
-                        logger.info(result_str)
-                    elif "not found" in result_str:
-                        # Yield user not found as error
-                        yield Either(
-                            left=StackTraceError(
-                                name="User Not Found",
-                                error=result_str,
-                                stackTrace=traceback.format_exc(),
-                            )
-                        )
-                    else:
-                        # Yield other messages as general info
-                        yield Either(
-                            left=StackTraceError(
-                                name="User Processing Info",
-                                error=result_str,
-                                stackTrace=traceback.format_exc(),
-                            )
-                        )
+        futures = {
+            executor.submit(self.metadata.create_or_update, request): (
+                user_data,
+                request,
+            )
+            for user_data, request in batch
+        }
+        updated = 0
+        for future in as_completed(futures):
+            user_data, request = futures[future]
+            try:
+                user = future.result()
+                if user is None:
+                    raise ValueError("no user returned by OpenMetadata")
             except Exception as e:
+                if self.state:
+                    self.state.record_failure(user_data)
                 yield Either(
                     left=StackTraceError(
-                        name="User Processing Error",
-                        error=f"Error processing user {user_data.get('email', 'unknown')}: {e}",
+                        name="User Update Error",
+                        error=f"Failed to update user {user_data.get('email', 'unknown')}: {e}",
                         stackTrace=traceback.format_exc(),
                     )
                 )
+                continue
+
+            updated += 1
+            self.status.scanned(user)
+            if self.state:
+                self.state.record(user_data)
+
+        logger.info(f"Updated {updated} of a batch of {len(batch)} users")
+
+    def _process_user(self, user_data: dict) -> Iterable[Either]:
+        """Yield the update of a GraphQL user, or why there is none"""
+        try:
+            result = self._update_user_entity(user_data)
+
+            # If result is a CreateUserRequest, yield it as right
+            if isinstance(result, CreateUserRequest):
+                yield Either(right=result)
+            else:
+                # Handle different types of string messages
+                result_str = str(result)
+                if "already up to date" in result_str:
+                    # Just log up-to-date users, don't yield as error
+                    logger.info(result_str)
+                    if self.state:
+                        self.state.record(user_data)
+                elif "not found" in result_str:
+                    # Yield user not found as error. It won't be found by
+                    # retrying, so it doesn't hold the watermark, and it is
+                    # processed again when it changes, having no fingerprint
+                    yield Either(
+                        left=StackTraceError(
+                            name="User Not Found",
+                            error=result_str,
+                            stackTrace=traceback.format_exc(),
+                        )
+                    )
+                else:
+                    # Yield other messages as general info
+                    if self.state:
+                        self.state.record_failure(user_data)
+                    yield Either(
+                        left=StackTraceError(
+                            name="User Processing Info",
+                            error=result_str,
+                            stackTrace=traceback.format_exc(),
+                        )
+                    )
+        except Exception as e:
+            if self.state:
+                self.state.record_failure(user_data)
+            yield Either(
+                left=StackTraceError(
+                    name="User Processing Error",
+                    error=f"Error processing user {user_data.get('email', 'unknown')}: {e}",
+                    stackTrace=traceback.format_exc(),
+                )
+            )
 
     def test_connection(self) -> None:
         """Test connection to both GraphQL endpoint and OpenMetadata"""
@@ -16,6 +16,7 @@ async function startServer() {
   console.log(`🚀 GraphQL server ready at ${url}`);
   console.log('Try querying:');
   console.log('- All users: { users { email displayName domain } }');
+  console.log('- A page of users: { users(offset: 0, limit: 100) { email displayName domain } }');
   console.log('- Specific user: { user(email: "admin@open-metadata.org") { email displayName domain } }');
 }
 
@@ -2,23 +2,35 @@ const staticUsers = [
   {
     email: 'admin@open-metadata.org',
     displayName: 'Admin Super User',
-    domain: 'Finance'
+    domain: 'Finance',
+    updatedAt: '2024-01-01T00:00:00Z'
   },
   {
     email: 'aaron_johnson0@gmail.com',
     displayName: 'Aaron Johnson',
-    domain: 'Marketing'
+    domain: 'Marketing',
+    updatedAt: '2024-01-01T00:00:00Z'
   },
   {
     email: 'brian_smith7@gmail.com',
     displayName: 'Brian Smith',
-    domain: 'Finance'
+    domain: 'Finance',
+    updatedAt: '2024-01-01T00:00:00Z'
   }
 ];
 
 const resolvers = {
   Query: {
-    users: () => staticUsers,
+    users: (parent, { offset = 0, limit, updatedSince }) => {
+      // ISO 8601 timestamps compare as strings. Users updated at the
+      // watermark itself are sent again, the connector skips them
+      const users = updatedSince
+        ? staticUsers.filter(user => user.updatedAt >= updatedSince)
+        : staticUsers;
+      return limit == null
+        ? users.slice(offset)
+        : users.slice(offset, offset + limit);
+    },
     user: (parent, args) => {
       return staticUsers.find(user => user.email === args.email);
     }
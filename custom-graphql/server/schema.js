@@ -5,10 +5,11 @@ const typeDefs = gql`
     email: String!
     displayName: String!
     domain: String!
+    updatedAt: String!
   }
 
   type Query {
-    users: [User!]!
+    users(offset: Int, limit: Int, updatedSince: String): [User!]!
     user(email: String!): User
   }
 `;
@@ -0,0 +1,132 @@
+"""
+Compare the streaming column index loader against the previous dict loader.
+
+It generates a synthetic CSV export and measures, for each loader, the load
+time, the peak memory allocated while loading and the time to look up every
+column name once:
+
+    python benchmark_loader.py --rows 1000000
+"""
+import argparse
+import csv
+import gc
+import logging
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from csv_importer import (CSVColumnSchema, clean_column_name, load_csv_data,
+                          logger)
+
+HEADER = [
+    "column.name*",
+    "column.displayName",
+    "column.description",
+    "column.dataTypeDisplay",
+    "column.dataType*",
+    "column.arrayDataType",
+    "column.dataLength",
+    "column.tags",
+    "column.glossaryTerms",
+]
+
+
+def legacy_load_csv_data(csv_path: str) -> dict[str, CSVColumnSchema]:
+    """The loader as it was before the column index, kept as the baseline"""
+    csv_data = {}
+    with open(csv_path, "r", encoding="utf-8") as file:
+        reader = csv.DictReader(file)
+        for row_num, row in enumerate(reader, 1):
+            try:
+                csv_row = CSVColumnSchema(**row)
+                cleaned_name = clean_column_name(csv_row.column_name)
+                csv_row.column_name = cleaned_name
+                csv_data[cleaned_name] = csv_row
+            except Exception:
+                continue
+    return csv_data
+
+
+def generate_csv(csv_path: Path, rows: int, distinct_descriptions: int) -> None:
+    """Glossary-like export: unique names, heavily repeated descriptions"""
+    rng = random.Random(42)
+    descriptions = [
+        f"Business definition number {i} shared by many columns of the catalog"
+        for i in range(distinct_descriptions)
+    ]
+    with open(csv_path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            writer.writerow(
+                [
+                    f"column_{i}",
+                    f"Column {i}",
+                    rng.choice(descriptions),
+                    "VARCHAR",
+                    "STRING",
+                    "",
+                    "",
+                    "",
+                    "",
+                ]
+            )
+
+
+def measure(name: str, load, names: list) -> None:
+    gc.collect()
+    start = time.perf_counter()
+    csv_data = load()
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for column_name in names:
+        csv_data.get(column_name)
+    lookup_time = time.perf_counter() - start
+    del csv_data
+
+    # Run again under tracemalloc, which slows down allocations
+    gc.collect()
+    tracemalloc.start()
+    csv_data = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del csv_data
+
+    print(
+        f"{name:<24} load {load_time:8.2f}s   "
+        f"peak {peak / 2**20:9.1f} MiB   "
+        f"lookups {lookup_time:6.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--distinct-descriptions", type=int, default=1_000)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / "columns.csv"
+        index_path = Path(tmp_dir) / "columns.idx"
+        generate_csv(csv_path, args.rows, args.distinct_descriptions)
+        names = [f"column_{i}" for i in range(args.rows)]
+
+        print(f"{args.rows} rows, {csv_path.stat().st_size / 2**20:.1f} MiB CSV")
+        measure("dict of models", lambda: legacy_load_csv_data(str(csv_path)), names)
+        measure("column index", lambda: load_csv_data(str(csv_path)), names)
+
+        load_csv_data(str(csv_path), str(index_path))
+        measure(
+            "memory-mapped index",
+            lambda: load_csv_data(str(csv_path), str(index_path)),
+            names,
+        )
+
+
+if __name__ == "__main__":
+    main()
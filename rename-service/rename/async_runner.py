@@ -0,0 +1,438 @@
+"""
+Asyncio runner
+
+Processes the same ServiceTopology as the TopologyRunner, but all the HTTP
+calls go through a pooled aiohttp session, with an adaptive rate limit that
+backs off when the server answers 429 or 503.
+"""
+import asyncio
+import contextvars
+import datetime
+import functools
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Union
+
+import requests
+from metadata.ingestion.ometa.client import APIError
+
+from rename.runner import ElementFailed, Subtree, TopologyRunner, get_element_fqn
+from rename.topology import (
+    TopologyContext,
+    TopologyNode,
+    get_topology_node,
+    get_topology_node_name,
+)
+
+THROTTLED_STATUS_CODES = (429, 503)
+
+# Marks the end of a producer in the element queues
+END = object()
+
+
+class AdaptiveRateLimiter:
+    """
+    Spaces out the requests. The rate is halved every time the server
+    throttles us, at most once per second, and grows again by ~1 request/s
+    every second while the requests succeed.
+    """
+
+    def __init__(self, max_rate: Optional[float] = None, min_rate: float = 1.0):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.min_rate = min_rate
+        self._next_slot = 0.0
+        self._last_throttle = 0.0
+        self._sent = deque(maxlen=1000)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            self._sent.append(now)
+            wait = self._next_slot - now
+            if self.rate:
+                self._next_slot = max(now, self._next_slot) + 1 / self.rate
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def observed_rate(self) -> float:
+        if len(self._sent) < 2:
+            return self.min_rate
+        return len(self._sent) / max(self._sent[-1] - self._sent[0], 1)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        now = time.monotonic()
+        if retry_after:
+            self._next_slot = max(self._next_slot, now + retry_after)
+        if now - self._last_throttle < 1:
+            return
+
+        self._last_throttle = now
+        self.rate = max((self.rate or self.observed_rate()) / 2, self.min_rate)
+        logging.warning(
+            f"Server is throttling us, slowing down to {self.rate:.1f} req/s"
+        )
+
+    def succeeded(self) -> None:
+        if self.rate and (not self.max_rate or self.rate < self.max_rate):
+            self.rate += 1 / self.rate
+
+
+class AsyncRestClient:
+    """
+    Pooled async version of the ometa REST client
+    """
+
+    def __init__(
+        self,
+        config,
+        max_connections: int,
+        rate_limiter: AdaptiveRateLimiter,
+        max_retries: int = 8,
+    ):
+        self.config = config
+        self.max_connections = max_connections
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.session = None
+        self._token_lock = asyncio.Lock()
+        # Not the loop's default executor: its threads may all be waiting
+        # on requests that need the token
+        self._token_executor = ThreadPoolExecutor(max_workers=1)
+
+    async def open(self) -> None:
+        try:
+            import aiohttp
+        except ImportError as err:
+            raise ImportError(
+                "The async engine requires aiohttp. "
+                "Install it with `pip install -e .[async]`"
+            ) from err
+
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+        )
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+        self._token_executor.shutdown(wait=False)
+
+    async def get_token(self, rejected: Optional[str] = None) -> Optional[str]:
+        """
+        Get a new token when the current one expires, as the ometa REST
+        client does, or when the server rejected it. The config is shared
+        with the REST client, which picks the new token up after the run.
+        """
+        config = self.config
+        if not config.auth_token:
+            return None
+
+        async with self._token_lock:
+            now = datetime.datetime.utcnow().timestamp()
+            if (
+                not config.access_token
+                or (config.expires_in and now >= config.expires_in)
+                or (rejected and rejected == config.access_token)
+            ):
+                # Token providers may block on their own HTTP calls
+                token = await asyncio.get_running_loop().run_in_executor(
+                    self._token_executor, config.auth_token
+                )
+                token, expiry = token if isinstance(token, tuple) else (token, None)
+                config.access_token = token
+                if token != "no_token" and expiry is not None:
+                    if isinstance(expiry, datetime.datetime):
+                        config.expires_in = expiry.timestamp() - 120
+                    else:
+                        config.expires_in = now + expiry - 120
+            return config.access_token
+
+    async def request(self, method: str, path: str, data: Any = None) -> Any:
+        url = f"{self.config.base_url}/{self.config.api_version}{path}"
+        content_type = (
+            "application/json-patch+json" if method == "PATCH" else "application/json"
+        )
+        headers = {} if method == "GET" else {"Content-Type": content_type}
+        options = (
+            {"params": {k: v for k, v in (data or {}).items() if v is not None}}
+            if method == "GET"
+            else {"data": data}
+        )
+
+        refreshed = False
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            token = await self.get_token()
+            if token:
+                headers[self.config.auth_header] = (
+                    f"{self.config.auth_token_mode} {token}"
+                )
+            async with self.session.request(
+                method, url, headers=headers, **options
+            ) as resp:
+                text = await resp.text()
+                if (
+                    resp.status == 401
+                    and token
+                    and not refreshed
+                    and attempt < self.max_retries
+                ):
+                    await self.get_token(rejected=token)
+                    refreshed = True
+                    continue
+                if resp.status in THROTTLED_STATUS_CODES and attempt < self.max_retries:
+                    retry_after = resp.headers.get("Retry-After")
+                    self.rate_limiter.throttled(
+                        float(retry_after) if retry_after else None
+                    )
+                    continue
+                if resp.status >= 400:
+                    raise api_error(resp.status, text)
+
+            self.rate_limiter.succeeded()
+            return json.loads(text) if text else None
+
+
+def api_error(status: int, text: str) -> APIError:
+    """
+    Raise the same error as the ometa client, so that its callers can
+    keep checking the status code
+    """
+    response = requests.Response()
+    response.status_code = status
+    try:
+        error = json.loads(text)
+    except ValueError:
+        error = {"code": status, "message": text}
+    return APIError(error, http_error=requests.HTTPError(response=response))
+
+
+class ClientBridge:
+    """
+    Exposes the async client with the interface of the ometa REST client,
+    for the producers and processors running in worker threads
+    """
+
+    def __init__(self, client: AsyncRestClient, loop: asyncio.AbstractEventLoop):
+        self.client = client
+        self.config = client.config
+        self.loop = loop
+
+    def _call(self, method: str, path: str, data: Any = None) -> Any:
+        return asyncio.run_coroutine_threadsafe(
+            self.client.request(method, path, data), self.loop
+        ).result()
+
+    def get(self, path: str, data: Any = None) -> Any:
+        return self._call("GET", path, data)
+
+    def post(self, path: str, data: Any = None) -> Any:
+        return self._call("POST", path, data)
+
+    def put(self, path: str, data: Any = None) -> Any:
+        return self._call("PUT", path, data)
+
+    def patch(self, path: str, data: Any = None) -> Any:
+        return self._call("PATCH", path, data)
+
+    def delete(self, path: str, data: Any = None) -> Any:
+        return self._call("DELETE", path, data)
+
+
+class AsyncTopologyRunner(TopologyRunner):
+    """
+    Topology runner on an asyncio event loop.
+
+    Each producer streams its elements into a bounded queue, and up to
+    `workers` producers and `workers` processors run at the same time. Processors can be
+    coroutines; producers and regular processors run in threads, where
+    the ometa client sends its requests through the shared async session.
+    Each element sees its own copy of its parent's context.
+    """
+
+    def __init__(
+        self,
+        *args,
+        max_rate: Optional[float] = None,
+        queue_size: int = 100,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.max_rate = max_rate
+        self.queue_size = queue_size
+        self._context_var = contextvars.ContextVar(
+            f"topology_context_{id(self)}", default=None
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._producers: Optional[asyncio.Semaphore] = None
+        self._error: Optional[Exception] = None
+
+    @property
+    def context(self) -> TopologyContext:
+        return self._context_var.get() or self._root_context
+
+    @contextmanager
+    def scoped_context(self, context: TopologyContext):
+        token = self._context_var.set(context)
+        try:
+            yield context
+        finally:
+            self._context_var.reset(token)
+
+    def process_topology(self) -> None:
+        asyncio.run(self.process_topology_async())
+
+    async def process_topology_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.workers * 2 + 4))
+        self._slots = asyncio.Semaphore(self.workers)
+        self._producers = asyncio.Semaphore(self.workers)
+
+        rest_client = self.metadata.client
+        client = AsyncRestClient(
+            rest_client.config,
+            max_connections=self.workers * 2,
+            rate_limiter=AdaptiveRateLimiter(self.max_rate),
+        )
+        await client.open()
+        self.metadata.client = ClientBridge(client, loop)
+        logging.info(f"Processing the topology with {self.workers} async workers")
+        try:
+            await self.process_nodes_async([self.topology.root])
+        finally:
+            self.metadata.client = rest_client
+            await client.close()
+
+        if self._error:
+            raise self._error
+
+    async def call(self, fn: Callable, *args) -> Any:
+        """
+        Await coroutines, and run anything else in a worker thread with
+        the current context
+        """
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(*args)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(context.run, fn, *args)
+        )
+
+    async def produce_async(
+        self, node: str, producer_fn: Callable, queue: asyncio.Queue
+    ) -> None:
+        """
+        Stream the elements into the queue. The listing holds a producer
+        slot until it is drained, so that at most `workers` queues and pages
+        are held whatever the number of parents processed.
+        """
+        async with self._producers:
+            elements = self.produce(node, producer_fn)
+            try:
+                while True:
+                    element = await self.call(next, elements, END)
+                    await queue.put(element)
+                    if element is END:
+                        return
+            except Exception:
+                await queue.put(END)
+                raise
+
+    async def process_nodes_async(
+        self, nodes: List[TopologyNode], parent: Optional[Subtree] = None
+    ) -> None:
+        for node in nodes:
+            logging.info(f"Node [{node}]")
+            node_name = get_topology_node_name(node, self.topology)
+            producer_fn = getattr(self, node.producer)
+            processor_fn = getattr(self, node.processor)
+
+            child_nodes = (
+                [get_topology_node(child, self.topology) for child in node.children]
+                if node.children
+                else []
+            )
+
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            producer = asyncio.create_task(
+                self.produce_async(node_name, producer_fn, queue)
+            )
+            tasks = set()
+            stopped = False
+            while True:
+                element = await queue.get()
+                if element is END:
+                    break
+                element = self.skip_done(node_name, element)
+                if element is None:
+                    continue
+
+                subtree = Subtree(
+                    node=node_name,
+                    fqn=get_element_fqn(element),
+                    parent=parent,
+                    on_complete=self.complete_subtree,
+                )
+                if self._error:
+                    # Don't let the parent be journaled as complete
+                    subtree.done(failed=True)
+                    stopped = True
+                    break
+                await self._slots.acquire()
+                task = asyncio.create_task(
+                    self.process_element_async(
+                        processor_fn,
+                        element,
+                        child_nodes,
+                        self.context.copy(),
+                        subtree,
+                    )
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if stopped:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+            await asyncio.gather(*tasks)
+            if stopped:
+                return
+            await producer
+
+    async def process_element_async(
+        self,
+        processor_fn: Callable,
+        element: Union[dict, list],
+        child_nodes: List[TopologyNode],
+        context: TopologyContext,
+        subtree: Subtree,
+    ) -> None:
+        """
+        Process an element, then its children. The element only holds an
+        in-flight slot while its processor runs.
+        """
+        self._context_var.set(context)
+        failed = True
+        try:
+            try:
+                await self.call(processor_fn, element)
+                self.progress.processed(
+                    subtree.node, len(element) if isinstance(element, list) else 1
+                )
+            finally:
+                self._slots.release()
+            await self.process_nodes_async(child_nodes, parent=subtree)
+            failed = False
+        except ElementFailed as err:
+            self.element_failed(subtree, element, err)
+        except Exception as err:
+            logging.error(f"Error processing the topology [{err}]")
+            self._error = self._error or err
+        finally:
+            subtree.done(failed=failed)
@@ -0,0 +1,102 @@
+"""
+Per run cache of the entities created under the output service
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple, Type, TypeVar
+
+from metadata.generated.schema.type.entityReference import EntityReference
+from pydantic import BaseModel
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def get_entity_type_name(entity: Type[BaseModel]) -> str:
+    """
+    Type of the EntityReference, e.g., DatabaseSchema -> databaseSchema
+    """
+    name = entity.__name__
+    return name[0].lower() + name[1:]
+
+
+class EntityReferenceCache:
+    """
+    LRU cache of FQN -> EntityReference shared by all the topology nodes.
+
+    It is filled with the entities returned by the create calls, so parents
+    are referenced without building a new EntityReference for every child,
+    and lookups of entities created earlier in the run don't hit the server.
+    On a miss, the entity is fetched by name with `lookup`.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[[Type[T], str], Optional[T]],
+        max_size: int = 10_000,
+    ):
+        self.lookup = lookup
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._references: "OrderedDict[Tuple[str, str], EntityReference]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _get(self, cache: OrderedDict, key):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def _put(self, cache: OrderedDict, key, value) -> None:
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            if len(cache) > self.max_size:
+                cache.popitem(last=False)
+
+    def add(self, entity: BaseModel) -> EntityReference:
+        """
+        Cache an entity returned by the server
+        """
+        reference = EntityReference(
+            id=entity.id,
+            type=get_entity_type_name(type(entity)),
+            name=entity.name.__root__,
+            fullyQualifiedName=entity.fullyQualifiedName.__root__,
+        )
+        key = (reference.type, reference.fullyQualifiedName)
+        self._put(self._references, key, reference)
+        return reference
+
+    def reference_to(self, entity: BaseModel) -> EntityReference:
+        """
+        Reference to an entity we already have, e.g., from the context
+        """
+        key = (get_entity_type_name(type(entity)), entity.fullyQualifiedName.__root__)
+        return self._get(self._references, key) or self.add(entity)
+
+    def get(self, entity_type: Type[T], fqn: str) -> Optional[EntityReference]:
+        """
+        Reference to an entity of the output service by its FQN
+        """
+        reference = self._get(
+            self._references, (get_entity_type_name(entity_type), fqn)
+        )
+        if reference:
+            return reference
+
+        entity = self.lookup(entity_type, fqn)
+        return self.add(entity) if entity else None
+
+    def log(self) -> None:
+        logging.info(
+            f"Entity cache: {self.hits} hits, {self.misses} misses,"
+            f" {len(self._references)} references kept"
+        )
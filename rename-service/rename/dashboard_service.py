@@ -0,0 +1,174 @@
+"""
+Dashboard Services: service -> charts, dashboards
+"""
+import logging
+from typing import Iterable, List, Optional, Union
+
+from metadata.generated.schema.api.data.createChart import CreateChartRequest
+from metadata.generated.schema.api.data.createDashboard import (
+    CreateDashboardRequest,
+)
+from metadata.generated.schema.api.services.createDashboardService import (
+    CreateDashboardServiceRequest,
+)
+from metadata.generated.schema.entity.data.chart import Chart
+from metadata.generated.schema.entity.data.dashboard import Dashboard
+from metadata.generated.schema.entity.services.dashboardService import (
+    DashboardConnection,
+    DashboardService,
+)
+from metadata.generated.schema.type.entityReference import EntityReference
+
+from rename.async_runner import AsyncTopologyRunner
+from rename.helpers import get_owner, get_tag_label
+from rename.runner import ElementFailed
+from rename.source import ServiceSource
+from rename.topology import ServiceTopology, TopologyNode
+
+DASHBOARD_SERVICE_FIELDS = ["owner"]
+CHART_FIELDS = ["owner", "tags"]
+DASHBOARD_FIELDS = ["owner", "tags", "charts"]
+
+
+class DashboardServiceTopology(ServiceTopology):
+    """
+    Defines the hierarchy in Dashboard Services.
+    service -> chart, dashboard. Charts go first, since dashboards
+    reference them.
+    """
+
+    root = TopologyNode(
+        producer="get_services",
+        processor="create_dashboard_service",
+        children=["chart", "dashboard"],
+    )
+    chart = TopologyNode(
+        producer="get_charts",
+        processor="create_chart",
+    )
+    dashboard = TopologyNode(
+        producer="get_dashboards",
+        processor="create_dashboard",
+    )
+
+
+class DashboardServiceSource(ServiceSource):
+    topology = DashboardServiceTopology()
+    service_entity = DashboardService
+    service_fields = DASHBOARD_SERVICE_FIELDS
+
+    def plan_context(self, node: str, element: Union[dict, list]) -> None:
+        if node == "root":
+            self.context.dashboard_service = DashboardService.parse_obj(element)
+
+    def create_dashboard_service(self, service: dict) -> None:
+        logging.info(f"Processing service {service.get('name')}")
+
+        self.context.dashboard_service = self.create_entity(
+            CreateDashboardServiceRequest(
+                name=self.output_service_name,
+                displayName=service.get("displayName"),
+                description=service.get("description"),
+                owner=get_owner(service),
+                serviceType=service.get("serviceType"),
+                connection=DashboardConnection.parse_obj(service.get("connection")),
+            )
+        )
+
+    def get_charts(self) -> Iterable[dict]:
+        yield from self.get_service_entities(entity=Chart, fields=CHART_FIELDS)
+
+    def create_chart(self, chart: dict) -> EntityReference:
+        logging.info(f"Processing chart {chart.get('name')}")
+
+        try:
+            entity = self.create_entity(
+                CreateChartRequest(
+                    name=chart.get("name"),
+                    displayName=chart.get("displayName"),
+                    description=chart.get("description"),
+                    chartType=chart.get("chartType"),
+                    chartUrl=chart.get("chartUrl"),
+                    owner=get_owner(chart),
+                    tags=get_tag_label(chart),
+                    service=self.references.reference_to(
+                        self.context.dashboard_service
+                    ),
+                )
+            )
+            return self.references.reference_to(entity)
+        except Exception as err:
+            logging.error(f"Error creating chart from [{chart}] due to [{err}]")
+            raise ElementFailed(f"Error creating chart {chart.get('name')}") from err
+
+    def get_chart_reference(self, chart: dict) -> Optional[EntityReference]:
+        """
+        Reference to the output chart of a dashboard. With several workers
+        the dashboards can be processed before all the charts are, so we
+        create the missing ones on the spot.
+        """
+        reference = self.references.get(Chart, self.output_fqn(chart.get("name")))
+        if reference:
+            return reference
+
+        input_chart = self.get_raw_entity_by_name(
+            entity=Chart,
+            fqn=chart.get("fullyQualifiedName"),
+            fields=CHART_FIELDS,
+        )
+        if not input_chart:
+            logging.warning(f"Chart [{chart.get('fullyQualifiedName')}] not found")
+            return None
+        return self.create_chart(input_chart)
+
+    def get_dashboards(self) -> Iterable[dict]:
+        yield from self.get_service_entities(entity=Dashboard, fields=DASHBOARD_FIELDS)
+
+    def create_dashboard(self, dashboard: dict) -> None:
+        logging.info(f"Processing dashboard {dashboard.get('name')}")
+
+        charts: List[EntityReference] = []
+        missing_charts = 0
+        for chart in dashboard.get("charts") or []:
+            try:
+                reference = self.get_chart_reference(chart)
+            except ElementFailed:
+                missing_charts += 1
+                continue
+            if reference:
+                charts.append(reference)
+
+        try:
+            self.create_entity(
+                CreateDashboardRequest(
+                    name=dashboard.get("name"),
+                    displayName=dashboard.get("displayName"),
+                    description=dashboard.get("description"),
+                    dashboardUrl=dashboard.get("dashboardUrl"),
+                    charts=charts or None,
+                    owner=get_owner(dashboard),
+                    tags=get_tag_label(dashboard),
+                    service=self.references.reference_to(
+                        self.context.dashboard_service
+                    ),
+                    extension=dashboard.get("extension"),
+                )
+            )
+        except Exception as err:
+            logging.error(f"Error creating dashboard from [{dashboard}] due to [{err}]")
+            raise ElementFailed(
+                f"Error creating dashboard {dashboard.get('name')}"
+            ) from err
+
+        if missing_charts:
+            # Created without them, retried with --resume once they exist
+            raise ElementFailed(
+                f"Dashboard {dashboard.get('name')} was created without"
+                f" {missing_charts} of its charts"
+            )
+
+
+class AsyncDashboardServiceSource(DashboardServiceSource, AsyncTopologyRunner):
+    """
+    Same topology, processed by the asyncio runner
+    """
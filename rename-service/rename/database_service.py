@@ -1,5 +1,7 @@
 import logging
-from typing import Iterable
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple, Union
 
 from metadata.generated.schema.api.data.createDatabase import CreateDatabaseRequest
 from metadata.generated.schema.api.data.createDatabaseSchema import (
@@ -21,13 +23,29 @@ from metadata.generated.schema.entity.services.databaseService import (
     DatabaseConnection,
     DatabaseService,
 )
-from metadata.generated.schema.type.entityReference import EntityReference
-from metadata.ingestion.ometa.ometa_api import OpenMetadata
-from metadata.utils import fqn
+from metadata.ingestion.ometa.client import APIError
 
-from rename.helpers import get_owner, get_table_constraint, get_tag_label
-from rename.runner import TopologyRunner
-from rename.topology import ServiceTopology, TopologyContext, TopologyNode
+from rename.async_runner import AsyncTopologyRunner
+from rename.helpers import chunks, get_owner, get_table_constraint, get_tag_label
+from rename.runner import ElementFailed
+from rename.source import ServiceSource
+from rename.topology import ServiceTopology, TopologyNode
+
+# Fields requested when listing each entity, on top of the ones the API always
+# returns. Only ask for what the processors read: "*" would also bring usage,
+# followers, sample data, profiles...
+DATABASE_SERVICE_FIELDS = ["owner"]
+DATABASE_FIELDS = ["owner"]
+DATABASE_SCHEMA_FIELDS = ["owner"]
+TABLE_FIELDS = [
+    "owner",
+    "tags",
+    "columns",
+    "tableConstraints",
+    "tablePartition",
+    "tableProfilerConfig",
+    "viewDefinition",
+]
 
 
 class DatabaseServiceTopology(ServiceTopology):
@@ -52,32 +70,42 @@ class DatabaseServiceTopology(ServiceTopology):
         children=["table"],
     )
     table = TopologyNode(
-        producer="get_tables",
-        processor="create_table",
+        producer="get_table_batches",
+        processor="create_tables",
     )
 
 
-class DatabaseServiceSource(TopologyRunner):
+class DatabaseServiceSource(ServiceSource):
     topology = DatabaseServiceTopology()
-    context = TopologyContext()
+    service_entity = DatabaseService
+    service_fields = DATABASE_SERVICE_FIELDS
 
-    def __init__(
-        self, input_service_name: str, output_service_name: str, metadata: OpenMetadata
-    ):
-        self.input_service_name = input_service_name
-        self.output_service_name = output_service_name
-        self.metadata = metadata
+    def __init__(self, *args, batch_size: int = 100, max_in_flight: int = 8, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        # Flipped off the first time the server tells us it has no bulk endpoint
+        self.bulk_supported = True
+        # Shared by all the batches, so that at most `max_in_flight` table
+        # requests are in flight however many workers send batches
+        self._table_executor: Optional[ThreadPoolExecutor] = None
+        self._table_executor_lock = threading.Lock()
 
-    def get_services(self) -> Iterable[dict]:
-        for service in self.list_all_raw_entities(entity=DatabaseService, fields=["*"]):
-            if service.get("name") == self.input_service_name:
-                yield service
+    def plan_context(self, node: str, element: Union[dict, list]) -> None:
+        if node == "root":
+            self.context.database_service = DatabaseService.parse_obj(element)
+        elif node == "database":
+            self.context.database = Database.parse_obj(element)
+            self.context.input_database_fqn = element.get("fullyQualifiedName")
+        elif node == "database_schema":
+            self.context.database_schema = DatabaseSchema.parse_obj(element)
+            self.context.input_database_schema_fqn = element.get("fullyQualifiedName")
 
     def create_database_service(self, service: dict) -> None:
         logging.info(f"Processing service {service.get('name')}")
 
         # update context
-        self.context.database_service = self.metadata.create_or_update(
+        self.context.database_service = self.create_entity(
             CreateDatabaseServiceRequest(
                 name=self.output_service_name,
                 displayName=service.get("displayName"),
@@ -89,24 +117,20 @@ class DatabaseServiceSource(TopologyRunner):
         )
 
     def get_databases(self) -> Iterable[dict]:
-        yield from self.list_all_raw_entities(
-            entity=Database,
-            params={"service": self.input_service_name},
-        )
+        yield from self.get_service_entities(entity=Database, fields=DATABASE_FIELDS)
 
     def create_database(self, database: dict) -> None:
         logging.info(f"Processing database {database.get('name')}")
 
-        self.context.database = self.metadata.create_or_update(
+        # Its schemas are listed by the FQN the server gave it
+        self.context.input_database_fqn = database.get("fullyQualifiedName")
+        self.context.database = self.create_entity(
             CreateDatabaseRequest(
                 name=database.get("name"),
                 displayName=database.get("displayName"),
                 description=database.get("description"),
                 owner=get_owner(database),
-                service=EntityReference(
-                    id=self.context.database_service.id,
-                    type="databaseService",
-                ),
+                service=self.references.reference_to(self.context.database_service),
                 default=database.get("default"),
             )
         )
@@ -114,80 +138,184 @@ class DatabaseServiceSource(TopologyRunner):
     def get_database_schemas(self) -> Iterable[dict]:
         yield from self.list_all_raw_entities(
             entity=DatabaseSchema,
-            params={
-                "database": fqn.build(
-                    metadata=self.metadata,
-                    entity_type=Database,
-                    service_name=self.input_service_name,
-                    database_name=self.context.database.name.__root__,
-                )
-            },
+            fields=DATABASE_SCHEMA_FIELDS,
+            params={"database": self.context.input_database_fqn},
         )
 
     def create_database_schema(self, schema: dict) -> None:
         logging.info(f"Processing database_schema {schema.get('name')}")
 
-        self.context.database_schema = self.metadata.create_or_update(
+        self.context.input_database_schema_fqn = schema.get("fullyQualifiedName")
+        self.context.database_schema = self.create_entity(
             CreateDatabaseSchemaRequest(
                 name=schema.get("name"),
                 displayName=schema.get("displayName"),
                 description=schema.get("description"),
                 owner=get_owner(schema),
-                database=EntityReference(
-                    id=self.context.database.id,
-                    type="database",
-                ),
+                database=self.references.reference_to(self.context.database),
             )
         )
 
     def get_tables(self) -> Iterable[dict]:
         yield from self.list_all_raw_entities(
             entity=Table,
-            params={
-                "database": fqn.build(
-                    metadata=self.metadata,
-                    entity_type=DatabaseSchema,
-                    service_name=self.input_service_name,
-                    database_name=self.context.database.name.__root__,
-                    schema_name=self.context.database_schema.name.__root__,
-                )
-            },
-            fields=["*"],
+            params={"database": self.context.input_database_schema_fqn},
+            fields=TABLE_FIELDS,
+        )
+
+    def get_table_batches(self) -> Iterable[List[dict]]:
+        yield from chunks(self.get_tables(), self.batch_size)
+
+    def build_table_request(self, table: dict) -> CreateTableRequest:
+        return CreateTableRequest(
+            name=table.get("name"),
+            displayName=table.get("displayName"),
+            description=table.get("description"),
+            owner=get_owner(table),
+            databaseSchema=self.references.reference_to(self.context.database_schema),
+            tableType=table.get("tableType"),
+            columns=[Column.parse_obj(column) for column in table.get("columns")],
+            tableConstraints=get_table_constraint(table.get("tableConstraints"))
+            if table.get("tableConstraints")
+            else None,
+            tablePartition=TablePartition.parse_obj(table.get("tablePartition"))
+            if table.get("tablePartition")
+            else None,
+            tableProfilerConfig=TableProfilerConfig.parse_obj(
+                table.get("tableProfilerConfig")
+            )
+            if table.get("tableProfilerConfig")
+            else None,
+            viewDefinition=table.get("viewDefinition"),
+            tags=get_tag_label(table),
         )
 
+    @staticmethod
+    def log_table_error(table: dict, err: Exception) -> None:
+        logging.error(f"Error creating table from [{table}] due to [{err}]")
+        logging.error(table.get("tableConstraints"))
+
     def create_table(self, table: dict) -> None:
         logging.info(f"Processing table {table.get('name')}")
 
         try:
-            self.metadata.create_or_update(
-                CreateTableRequest(
-                    name=table.get("name"),
-                    displayName=table.get("displayName"),
-                    description=table.get("description"),
-                    owner=get_owner(table),
-                    databaseSchema=EntityReference(
-                        id=self.context.database_schema.id,
-                        type="databaseSchema",
-                    ),
-                    tableType=table.get("tableType"),
-                    columns=[
-                        Column.parse_obj(column) for column in table.get("columns")
-                    ],
-                    tableConstraints=get_table_constraint(table.get("tableConstraints"))
-                    if table.get("tableConstraints")
-                    else None,
-                    tablePartition=TablePartition.parse_obj(table.get("tablePartition"))
-                    if table.get("tablePartition")
-                    else None,
-                    tableProfilerConfig=TableProfilerConfig.parse_obj(
-                        table.get("tableProfilerConfig")
-                    )
-                    if table.get("tableProfilerConfig")
-                    else None,
-                    viewDefinition=table.get("viewDefinition"),
-                    tags=get_tag_label(table),
-                )
+            self.metadata.create_or_update(self.build_table_request(table))
+        except Exception as err:
+            self.log_table_error(table, err)
+            raise ElementFailed(f"Error creating table {table.get('name')}") from err
+        self.journal.record("table", table.get("fullyQualifiedName"))
+
+    def create_tables(self, tables: List[dict]) -> None:
+        """
+        Create a batch of tables of the same schema. We first try the bulk
+        endpoint, and otherwise send one request per table, keeping
+        `max_in_flight` of them in flight. The tables created are journaled
+        one by one, and if any failed, the whole batch is reported as
+        failed so that its schema is not journaled as done.
+        """
+        logging.info(f"Processing {len(tables)} tables")
+
+        requests = []
+        failed = 0
+        for table in tables:
+            try:
+                requests.append((table, self.build_table_request(table)))
+            except Exception as err:
+                self.log_table_error(table, err)
+                failed += 1
+
+        if requests:
+            bulk_failed = (
+                self.create_tables_in_bulk(requests) if self.bulk_supported else None
+            )
+            if bulk_failed is None:
+                failed += self.create_tables_pipelined(requests)
+            else:
+                failed += bulk_failed
+
+        if failed:
+            raise ElementFailed(
+                f"{failed} of {len(tables)} tables could not be created", count=failed
             )
+
+    def create_tables_in_bulk(
+        self, requests: List[Tuple[dict, CreateTableRequest]]
+    ) -> Optional[int]:
+        """
+        Send the whole batch in a single call and return the number of
+        tables that failed. Returns None if the batch still needs to be
+        sent table by table.
+        """
+        suffix = self.metadata.get_suffix(Table)
+        payload = "[" + ",".join(request.json() for _, request in requests) + "]"
+        try:
+            result = self.metadata.client.put(f"{suffix}/bulk", data=payload)
+        except APIError as err:
+            if err.status_code in (404, 405):
+                logging.info("No bulk endpoint for tables, creating them one by one")
+                self.bulk_supported = False
+            else:
+                logging.warning(
+                    f"Bulk table creation failed [{err}], retrying one by one"
+                )
+            return None
         except Exception as err:
-            logging.error(f"Error creating table from [{table}] due to [{err}]")
-            logging.error(table.get("tableConstraints"))
+            # Timeouts and connection errors: the tables are reported one by one
+            logging.warning(f"Bulk table creation failed [{err}], retrying one by one")
+            return None
+
+        tables_by_name = {request.name.__root__: table for table, request in requests}
+        failures = (result or {}).get("failedRequest") or []
+        for failure in failures:
+            failed_request = failure.get("request") or {}
+            table = tables_by_name.pop(failed_request.get("name"), failed_request)
+            self.log_table_error(table, Exception(failure.get("message")))
+
+        for table in tables_by_name.values():
+            self.journal.record("table", table.get("fullyQualifiedName"))
+        return len(failures)
+
+    def create_tables_pipelined(
+        self, requests: List[Tuple[dict, CreateTableRequest]]
+    ) -> int:
+        """
+        Send the tables one by one and return the number that failed
+        """
+
+        def create(table: dict, request: CreateTableRequest) -> bool:
+            logging.info(f"Processing table {table.get('name')}")
+            try:
+                self.metadata.create_or_update(request)
+            except Exception as err:
+                self.log_table_error(table, err)
+                return False
+            self.journal.record("table", table.get("fullyQualifiedName"))
+            return True
+
+        futures = [
+            self.table_executor.submit(create, table, request)
+            for table, request in requests
+        ]
+        return sum(not future.result() for future in futures)
+
+    @property
+    def table_executor(self) -> ThreadPoolExecutor:
+        with self._table_executor_lock:
+            if self._table_executor is None:
+                self._table_executor = ThreadPoolExecutor(
+                    max_workers=self.max_in_flight, thread_name_prefix="tables"
+                )
+            return self._table_executor
+
+    def close(self) -> None:
+        with self._table_executor_lock:
+            if self._table_executor:
+                self._table_executor.shutdown(wait=True)
+                self._table_executor = None
+        super().close()
+
+
+class AsyncDatabaseServiceSource(DatabaseServiceSource, AsyncTopologyRunner):
+    """
+    Same topology, processed by the asyncio runner
+    """
@@ -1,11 +1,14 @@
 import logging
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, TypeVar
 
 from metadata.generated.schema.entity.data.table import ConstraintType, TableConstraint
 from metadata.generated.schema.type.entityReference import EntityReference
 from metadata.generated.schema.type.tagLabel import TagLabel
 
+T = TypeVar("T")
+
 
 def get_owner(asset: dict) -> Optional[EntityReference]:
     try:
@@ -24,6 +27,13 @@ def get_tag_label(asset: dict) -> Optional[List[TagLabel]]:
         logging.warning(f"Error trying to get the tags [{err}]")
 
 
+def quote_name(name: str) -> str:
+    """
+    FQN of a service, quoting its name if it contains a separator
+    """
+    return f'"{name}"' if "." in name else name
+
+
 def get_enum_from_value(enum: Enum, value: Any) -> Optional[Enum]:
     return next(elem for elem in enum if elem.value == value)
 
@@ -42,3 +52,15 @@ def get_table_constraint(constraint: List[dict]) -> Optional[List[TableConstrain
 
     except Exception as err:
         logging.warning(f"Error processing constraints [{constraint}] - [{err}]")
+
+
+def chunks(iterable: Iterable[T], size: int) -> Iterable[List[T]]:
+    """
+    Group the elements of an iterable in lists of `size` elements
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,78 @@
+"""
+Append-only journal of the entities already recreated under the output service
+"""
+import json
+import logging
+import os
+import threading
+from typing import Optional, Set, Tuple
+
+
+class Journal:
+    """
+    Each line records an entity of the input service, identified by its
+    topology node and FQN, whose subtree has been recreated. The first
+    line identifies the rename, so that we don't resume a different one.
+    """
+
+    def __init__(self, path: Optional[str], input_service: str, output_service: str):
+        self.path = path
+        self.header = {"input": input_service, "output": output_service}
+        self.done: Set[Tuple[str, str]] = set()
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self, resume: bool = False) -> None:
+        if not self.path:
+            return
+
+        if resume and os.path.exists(self.path):
+            self.load()
+            self._file = open(self.path, "a", encoding="utf-8")
+            logging.info(
+                f"Resuming from [{self.path}], {len(self.done)} entities already done"
+            )
+            return
+
+        if resume:
+            logging.info(f"No journal found at [{self.path}], starting from scratch")
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._write(self.header)
+
+    def load(self) -> None:
+        with open(self.path, encoding="utf-8") as file:
+            lines = iter(file)
+            header = json.loads(next(lines, "{}"))
+            if header != self.header:
+                raise ValueError(
+                    f"The journal [{self.path}] belongs to another rename [{header}]"
+                )
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line cut by the interruption
+                    continue
+                self.done.add((entry["node"], entry["fqn"]))
+
+    def is_done(self, node: str, fqn: Optional[str]) -> bool:
+        return (node, fqn) in self.done
+
+    def record(self, node: str, fqn: Optional[str]) -> None:
+        if not fqn:
+            return
+        with self._lock:
+            self.done.add((node, fqn))
+            if self._file:
+                self._write({"node": node, "fqn": fqn})
+
+    def _write(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self, remove: bool = False) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+        if remove and self.path and os.path.exists(self.path):
+            os.remove(self.path)
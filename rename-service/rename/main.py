@@ -1,6 +1,7 @@
 import argparse
 import logging
 import pathlib
+from typing import Dict, Optional, Tuple, Type
 
 from metadata.config.common import load_config_file
 from metadata.generated.schema.entity.services.connections.metadata.openMetadataConnection import (
@@ -8,13 +9,53 @@ from metadata.generated.schema.entity.services.connections.metadata.openMetadata
 )
 from metadata.ingestion.ometa.ometa_api import OpenMetadata
 
-from rename.database_service import DatabaseServiceSource
+from rename.dashboard_service import (
+    AsyncDashboardServiceSource,
+    DashboardServiceSource,
+)
+from rename.database_service import (
+    AsyncDatabaseServiceSource,
+    DatabaseServiceSource,
+)
+from rename.messaging_service import (
+    AsyncMessagingServiceSource,
+    MessagingServiceSource,
+)
+from rename.pipeline_service import AsyncPipelineServiceSource, PipelineServiceSource
+from rename.plan import Planner
+from rename.source import ServiceSource
+from rename.storage_service import AsyncStorageServiceSource, StorageServiceSource
 
 root = logging.getLogger()
 root.setLevel(logging.INFO)
 
+# Service type -> (threads source, async source)
+SOURCES: Dict[str, Tuple[Type[ServiceSource], Type[ServiceSource]]] = {
+    "database": (DatabaseServiceSource, AsyncDatabaseServiceSource),
+    "dashboard": (DashboardServiceSource, AsyncDashboardServiceSource),
+    "pipeline": (PipelineServiceSource, AsyncPipelineServiceSource),
+    "messaging": (MessagingServiceSource, AsyncMessagingServiceSource),
+    "storage": (StorageServiceSource, AsyncStorageServiceSource),
+}
+
 
-def run(input_: str, output: str, config: str) -> None:
+def run(
+    input_: str,
+    output: str,
+    config: str,
+    service_type: str = "database",
+    workers: int = 1,
+    batch_size: int = 100,
+    max_in_flight: int = 8,
+    journal_path: Optional[str] = None,
+    resume: bool = False,
+    page_size: int = 1000,
+    engine: str = "threads",
+    max_rate: Optional[float] = None,
+    plan: bool = False,
+    plan_sample: int = 10,
+    cache_size: int = 10_000,
+) -> None:
     """
     Execute the renaming
     """
@@ -23,10 +64,30 @@ def run(input_: str, output: str, config: str) -> None:
     server_config = OpenMetadataConnection.parse_obj(config_dict)
     metadata = OpenMetadata(server_config)
 
-    db_service = DatabaseServiceSource(
-        input_service_name=input_, output_service_name=output, metadata=metadata
+    source_kwargs = dict(
+        input_service_name=input_,
+        output_service_name=output,
+        metadata=metadata,
+        workers=workers,
+        journal_path=journal_path,
+        page_size=page_size,
+        cache_size=cache_size,
     )
-    db_service.run()
+    if service_type == "database":
+        source_kwargs.update(batch_size=batch_size, max_in_flight=max_in_flight)
+
+    source_class, async_source_class = SOURCES[service_type]
+    if engine == "async":
+        source = async_source_class(max_rate=max_rate, **source_kwargs)
+    else:
+        source = source_class(**source_kwargs)
+
+    if plan:
+        planner = Planner(source, sample_size=plan_sample, concurrency=workers)
+        planner.log(planner.run())
+        return
+
+    source.run(resume=resume)
 
 
 def cli():
@@ -39,6 +100,82 @@ def cli():
     parser.add_argument(
         "-c", "--config", help="OpenMetadata server config file path", type=str
     )
+    parser.add_argument(
+        "-t",
+        "--service-type",
+        help="Type of the service to rename",
+        choices=list(SOURCES),
+        default="database",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Number of sibling entities processed concurrently",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--engine",
+        help="threads: worker pool on the blocking client. "
+        "async: asyncio runner on a pooled aiohttp session, "
+        "with --workers processors in flight",
+        choices=["threads", "async"],
+        default="threads",
+    )
+    parser.add_argument(
+        "--max-rate",
+        help="Maximum requests per second with the async engine. It is lowered "
+        "automatically when the server answers 429 or 503",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--batch-size",
+        help="Number of tables of the same schema created together",
+        type=int,
+        default=100,
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        help="Table requests kept in flight when the server has no bulk endpoint",
+        type=int,
+        default=8,
+    )
+    parser.add_argument(
+        "--page-size",
+        help="Number of entities requested per page when listing",
+        type=int,
+        default=1000,
+    )
+    parser.add_argument(
+        "--cache-size",
+        help="Number of entity references kept in memory during the run",
+        type=int,
+        default=10_000,
+    )
+    parser.add_argument(
+        "--plan",
+        help="Only estimate the number of entities, bytes, requests and the time "
+        "the rename would take, without writing anything",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--plan-sample",
+        help="Number of parents sampled per level with --plan",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--journal-path",
+        help="File keeping track of the entities already renamed",
+        type=str,
+        default="rename_journal.jsonl",
+    )
+    parser.add_argument(
+        "--resume",
+        help="Continue an interrupted rename, skipping what its journal recorded",
+        action="store_true",
+    )
 
     args = parser.parse_args()
 
@@ -46,6 +183,18 @@ def cli():
         input_=args.input,
         output=args.output,
         config=args.config,
+        service_type=args.service_type,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight,
+        journal_path=args.journal_path,
+        resume=args.resume,
+        page_size=args.page_size,
+        engine=args.engine,
+        max_rate=args.max_rate,
+        plan=args.plan,
+        plan_sample=args.plan_sample,
+        cache_size=args.cache_size,
     )
 
 
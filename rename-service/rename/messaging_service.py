@@ -0,0 +1,113 @@
+"""
+Messaging Services: service -> topics
+"""
+import logging
+from typing import Iterable, Union
+
+from metadata.generated.schema.api.data.createTopic import CreateTopicRequest
+from metadata.generated.schema.api.services.createMessagingService import (
+    CreateMessagingServiceRequest,
+)
+from metadata.generated.schema.entity.data.topic import Topic
+from metadata.generated.schema.entity.services.messagingService import (
+    MessagingConnection,
+    MessagingService,
+)
+
+from rename.async_runner import AsyncTopologyRunner
+from rename.helpers import get_owner, get_tag_label
+from rename.runner import ElementFailed
+from rename.source import ServiceSource
+from rename.topology import ServiceTopology, TopologyNode
+
+MESSAGING_SERVICE_FIELDS = ["owner"]
+TOPIC_FIELDS = ["owner", "tags"]
+
+# Topic properties copied as they are from the input topic
+TOPIC_PROPERTIES = [
+    "displayName",
+    "description",
+    "messageSchema",
+    "partitions",
+    "cleanupPolicies",
+    "replicationFactor",
+    "retentionTime",
+    "maximumMessageSize",
+    "minimumInSyncReplicas",
+    "retentionSize",
+    "topicConfig",
+    "extension",
+]
+
+
+class MessagingServiceTopology(ServiceTopology):
+    """
+    Defines the hierarchy in Messaging Services.
+    service -> topic.
+    """
+
+    root = TopologyNode(
+        producer="get_services",
+        processor="create_messaging_service",
+        children=["topic"],
+    )
+    topic = TopologyNode(
+        producer="get_topics",
+        processor="create_topic",
+    )
+
+
+class MessagingServiceSource(ServiceSource):
+    topology = MessagingServiceTopology()
+    service_entity = MessagingService
+    service_fields = MESSAGING_SERVICE_FIELDS
+
+    def plan_context(self, node: str, element: Union[dict, list]) -> None:
+        if node == "root":
+            self.context.messaging_service = MessagingService.parse_obj(element)
+
+    def create_messaging_service(self, service: dict) -> None:
+        logging.info(f"Processing service {service.get('name')}")
+
+        self.context.messaging_service = self.create_entity(
+            CreateMessagingServiceRequest(
+                name=self.output_service_name,
+                displayName=service.get("displayName"),
+                description=service.get("description"),
+                owner=get_owner(service),
+                serviceType=service.get("serviceType"),
+                connection=MessagingConnection.parse_obj(service.get("connection")),
+            )
+        )
+
+    def get_topics(self) -> Iterable[dict]:
+        yield from self.get_service_entities(entity=Topic, fields=TOPIC_FIELDS)
+
+    def create_topic(self, topic: dict) -> None:
+        logging.info(f"Processing topic {topic.get('name')}")
+
+        try:
+            self.create_entity(
+                CreateTopicRequest(
+                    name=topic.get("name"),
+                    owner=get_owner(topic),
+                    tags=get_tag_label(topic),
+                    service=self.references.reference_to(
+                        self.context.messaging_service
+                    ),
+                    **{
+                        key: topic.get(key)
+                        for key in TOPIC_PROPERTIES
+                        if topic.get(key) is not None
+                    },
+                )
+            )
+        except Exception as err:
+            logging.error(f"Error creating topic from [{topic}] due to [{err}]")
+            raise ElementFailed(f"Error creating topic {topic.get('name')}") from err
+
+
+class AsyncMessagingServiceSource(MessagingServiceSource, AsyncTopologyRunner):
+    """
+    Same topology, processed by the asyncio runner
+    """
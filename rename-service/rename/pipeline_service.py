@@ -0,0 +1,115 @@
+"""
+Pipeline Services: service -> pipelines
+"""
+import logging
+from typing import Iterable, List, Optional, Union
+
+from metadata.generated.schema.api.data.createPipeline import CreatePipelineRequest
+from metadata.generated.schema.api.services.createPipelineService import (
+    CreatePipelineServiceRequest,
+)
+from metadata.generated.schema.entity.data.pipeline import Pipeline, Task
+from metadata.generated.schema.entity.services.pipelineService import (
+    PipelineConnection,
+    PipelineService,
+)
+
+from rename.async_runner import AsyncTopologyRunner
+from rename.helpers import get_owner, get_tag_label
+from rename.runner import ElementFailed
+from rename.source import ServiceSource
+from rename.topology import ServiceTopology, TopologyNode
+
+PIPELINE_SERVICE_FIELDS = ["owner"]
+PIPELINE_FIELDS = ["owner", "tags", "tasks"]
+
+
+def get_tasks(pipeline: dict) -> Optional[List[Task]]:
+    """
+    Tasks of the input pipeline. Their FQNs are computed by the server
+    from the new service name.
+    """
+    if not pipeline.get("tasks"):
+        return None
+    return [
+        Task.parse_obj(
+            {key: value for key, value in task.items() if key != "fullyQualifiedName"}
+        )
+        for task in pipeline.get("tasks")
+    ]
+
+
+class PipelineServiceTopology(ServiceTopology):
+    """
+    Defines the hierarchy in Pipeline Services.
+    service -> pipeline. Tasks are part of the pipeline.
+    """
+
+    root = TopologyNode(
+        producer="get_services",
+        processor="create_pipeline_service",
+        children=["pipeline"],
+    )
+    pipeline = TopologyNode(
+        producer="get_pipelines",
+        processor="create_pipeline",
+    )
+
+
+class PipelineServiceSource(ServiceSource):
+    topology = PipelineServiceTopology()
+    service_entity = PipelineService
+    service_fields = PIPELINE_SERVICE_FIELDS
+
+    def plan_context(self, node: str, element: Union[dict, list]) -> None:
+        if node == "root":
+            self.context.pipeline_service = PipelineService.parse_obj(element)
+
+    def create_pipeline_service(self, service: dict) -> None:
+        logging.info(f"Processing service {service.get('name')}")
+
+        self.context.pipeline_service = self.create_entity(
+            CreatePipelineServiceRequest(
+                name=self.output_service_name,
+                displayName=service.get("displayName"),
+                description=service.get("description"),
+                owner=get_owner(service),
+                serviceType=service.get("serviceType"),
+                connection=PipelineConnection.parse_obj(service.get("connection")),
+            )
+        )
+
+    def get_pipelines(self) -> Iterable[dict]:
+        yield from self.get_service_entities(entity=Pipeline, fields=PIPELINE_FIELDS)
+
+    def create_pipeline(self, pipeline: dict) -> None:
+        logging.info(f"Processing pipeline {pipeline.get('name')}")
+
+        try:
+            self.create_entity(
+                CreatePipelineRequest(
+                    name=pipeline.get("name"),
+                    displayName=pipeline.get("displayName"),
+                    description=pipeline.get("description"),
+                    pipelineUrl=pipeline.get("pipelineUrl"),
+                    concurrency=pipeline.get("concurrency"),
+                    pipelineLocation=pipeline.get("pipelineLocation"),
+                    startDate=pipeline.get("startDate"),
+                    tasks=get_tasks(pipeline),
+                    owner=get_owner(pipeline),
+                    tags=get_tag_label(pipeline),
+                    service=self.references.reference_to(self.context.pipeline_service),
+                    extension=pipeline.get("extension"),
+                )
+            )
+        except Exception as err:
+            logging.error(f"Error creating pipeline from [{pipeline}] due to [{err}]")
+            raise ElementFailed(
+                f"Error creating pipeline {pipeline.get('name')}"
+            ) from err
+
+
+class AsyncPipelineServiceSource(PipelineServiceSource, AsyncTopologyRunner):
+    """
+    Same topology, processed by the asyncio runner
+    """
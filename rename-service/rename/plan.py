@@ -0,0 +1,155 @@
+"""
+Dry run of a rename: estimate its size and duration without writing anything
+"""
+import json
+import logging
+import math
+import time
+from datetime import timedelta
+from typing import List
+
+from pydantic import BaseModel
+
+from rename.runner import TopologyRunner
+from rename.topology import (
+    TopologyContext,
+    TopologyNode,
+    get_topology_node,
+    get_topology_node_name,
+)
+
+
+class LevelPlan(BaseModel):
+    """
+    Estimates for a topology node
+    """
+
+    node: str
+    sampled_parents: int
+    count: float
+    bytes_per_entity: float
+    list_requests: float
+    write_requests: float
+
+    @property
+    def bytes(self) -> float:
+        return self.count * self.bytes_per_entity
+
+
+class Planner:
+    """
+    Walks the topology with the runner's own producers, reading only the
+    first page of up to `sample_size` parents per level. The totals of
+    those pages tell how many children the average parent has, and the
+    sampled entities how big they are.
+
+    Assumes every entity is sent in its own write request, and that writes
+    take as long as the sampled reads.
+    """
+
+    def __init__(
+        self, runner: TopologyRunner, sample_size: int = 10, concurrency: int = 1
+    ):
+        self.runner = runner
+        self.sample_size = sample_size
+        self.concurrency = concurrency
+        self.page_size = runner.page_size
+        self.requests = 0
+        self.elapsed = 0.0
+
+    def run(self) -> List[LevelPlan]:
+        self.runner.max_pages = 1
+        self.runner.page_size = self.sample_size
+        plans = []
+        try:
+            self.plan_node(self.runner.topology.root, [TopologyContext()], 1, plans)
+        finally:
+            self.runner.max_pages = None
+            self.runner.page_size = self.page_size
+        return plans
+
+    def plan_node(
+        self,
+        node: TopologyNode,
+        contexts: List[TopologyContext],
+        parent_count: float,
+        plans: List[LevelPlan],
+    ) -> None:
+        node_name = get_topology_node_name(node, self.runner.topology)
+        producer_fn = getattr(self.runner, node.producer)
+
+        sampled = 0
+        size = 0
+        child_contexts = []
+        for context in contexts:
+            with self.runner.scoped_context(context.copy()):
+                start = time.perf_counter()
+                elements = list(self.runner.produce(node_name, producer_fn))
+                self.elapsed += time.perf_counter() - start
+                self.requests += 1
+
+                for element in elements:
+                    for entity in element if isinstance(element, list) else [element]:
+                        sampled += 1
+                        size += len(json.dumps(entity))
+                    if len(child_contexts) < self.sample_size:
+                        child_context = self.runner.context.copy()
+                        with self.runner.scoped_context(child_context):
+                            self.runner.plan_context(node_name, element)
+                        child_contexts.append(child_context)
+
+        level = self.runner.progress.levels[node_name]
+        if level.listings and node is not self.runner.topology.root:
+            per_parent = level.total / level.listings
+        else:
+            # The service is fetched by name
+            per_parent = sampled / len(contexts) if contexts else 0
+
+        plans.append(
+            LevelPlan(
+                node=node_name,
+                sampled_parents=len(contexts),
+                count=parent_count * per_parent,
+                bytes_per_entity=size / sampled if sampled else 0,
+                list_requests=parent_count
+                * max(math.ceil(per_parent / self.page_size), 1),
+                write_requests=parent_count * per_parent,
+            )
+        )
+
+        if not child_contexts:
+            return
+        for child in node.children or []:
+            self.plan_node(
+                get_topology_node(child, self.runner.topology),
+                child_contexts,
+                parent_count * per_parent,
+                plans,
+            )
+
+    def latency(self) -> float:
+        return self.elapsed / self.requests if self.requests else 0
+
+    def log(self, plans: List[LevelPlan]) -> None:
+        logging.info("Rename plan (nothing has been written):")
+        for plan in plans:
+            logging.info(
+                f"  {plan.node:<20} ~{plan.count:>12,.0f} entities"
+                f"  {plan.bytes / 2**20:>10,.1f} MiB"
+                f"  {plan.list_requests:>10,.0f} list requests"
+                f"  {plan.write_requests:>12,.0f} writes"
+                f"  (sampled {plan.sampled_parents} parents)"
+            )
+
+        requests = sum(plan.list_requests + plan.write_requests for plan in plans)
+        size = sum(plan.bytes for plan in plans)
+        duration = timedelta(seconds=int(requests * self.latency() / self.concurrency))
+        logging.info(
+            f"Total: ~{sum(plan.count for plan in plans):,.0f} entities,"
+            f" ~{size / 2**20:,.1f} MiB read and as much written,"
+            f" ~{requests:,.0f} requests"
+        )
+        logging.info(
+            f"Projected duration: ~{duration} with {self.concurrency} workers,"
+            f" at ~{self.latency() * 1000:.0f} ms per request"
+        )
@@ -0,0 +1,119 @@
+"""
+Progress and ETA of a topology run
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from rename.topology import ServiceTopology
+
+
+class LevelProgress(BaseModel):
+    """
+    Counters of a topology node. `total` is the sum of the `paging.total`
+    of the listings made so far, so it grows as the parents get processed.
+    """
+
+    total: int = 0
+    listings: int = 0
+    done: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+
+class Progress:
+    """
+    Keeps the done/total counters of each level of the topology.
+
+    The ETA extrapolates the number of leaf entities this run will process
+    from the listings made so far: if half of the schemas have had their
+    tables listed, we expect twice as many tables as we have seen.
+    """
+
+    def __init__(self, topology: ServiceTopology, log_interval: float = 10.0):
+        self.parents: Dict[str, str] = {}
+        self.leaves: List[str] = []
+        for name, node in topology.__dict__.items():
+            for child in node.children or []:
+                self.parents[child] = name
+            if not node.children:
+                self.leaves.append(name)
+
+        self.levels = {name: LevelProgress() for name in topology.__dict__}
+        self.log_interval = log_interval
+        self.started = time.monotonic()
+        self._last_log = self.started
+        self._lock = threading.Lock()
+
+    def listed(self, node: Optional[str], total: int) -> None:
+        if node not in self.levels:
+            return
+        with self._lock:
+            self.levels[node].listings += 1
+            self.levels[node].total += total
+
+    def processed(self, node: str, count: int = 1) -> None:
+        with self._lock:
+            self.levels[node].done += count
+        if node in self.leaves:
+            self.maybe_log()
+
+    def skipped(self, node: str, count: int = 1) -> None:
+        with self._lock:
+            self.levels[node].skipped += count
+
+    def failed(self, node: str, count: int = 1) -> None:
+        with self._lock:
+            self.levels[node].failed += count
+
+    def failures(self) -> int:
+        with self._lock:
+            return sum(level.failed for level in self.levels.values())
+
+    def expected(self, node: str) -> float:
+        """
+        Estimated number of entities of the node this run will process
+        """
+        level = self.levels[node]
+        parent = self.parents.get(node)
+        if not parent:
+            return max(level.done, 1)
+        if not level.listings:
+            return 0
+        return (level.total - level.skipped) * self.expected(parent) / level.listings
+
+    def eta(self) -> Optional[timedelta]:
+        done = sum(self.levels[leaf].done for leaf in self.leaves)
+        if not done:
+            return None
+        remaining = sum(
+            max(
+                self.expected(leaf) - self.levels[leaf].done - self.levels[leaf].failed,
+                0,
+            )
+            for leaf in self.leaves
+        )
+        elapsed = time.monotonic() - self.started
+        return timedelta(seconds=int(elapsed * remaining / done))
+
+    def maybe_log(self) -> None:
+        now = time.monotonic()
+        if now - self._last_log < self.log_interval:
+            return
+        self._last_log = now
+        self.log()
+
+    def log(self) -> None:
+        with self._lock:
+            counters = ", ".join(
+                f"{name} {level.done + level.skipped}/{level.total}"
+                + (f" ({level.failed} failed)" if level.failed else "")
+                for name, level in self.levels.items()
+                if name in self.parents
+            )
+            eta = self.eta()
+        logging.info(f"Progress: {counters} - ETA {eta if eta is not None else '?'}")
@@ -2,34 +2,236 @@
 Runner
 """
 import logging
-from typing import Dict, List, Optional, Type, TypeVar
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Type, TypeVar, Union
+from urllib.parse import quote
 
+from metadata.ingestion.ometa.client import APIError
 from metadata.ingestion.ometa.ometa_api import OpenMetadata
 from pydantic import BaseModel
 
-from rename.topology import ServiceTopology, TopologyNode, get_topology_node
+from rename.cache import EntityReferenceCache
+from rename.journal import Journal
+from rename.progress import Progress
+from rename.topology import (
+    ServiceTopology,
+    TopologyContext,
+    TopologyNode,
+    get_topology_node,
+    get_topology_node_name,
+)
 
 T = TypeVar("T", bound=BaseModel)
 
 
+class ElementFailed(Exception):
+    """
+    Raised by a processor when its element, or `count` entities of its
+    batch, could not be recreated. The run goes on, but the element and
+    its ancestors are not journaled as done, so `--resume` retries them.
+    """
+
+    def __init__(self, message: str, count: int = 1):
+        super().__init__(message)
+        self.count = count
+
+
 class RawEntityList(BaseModel):
     entities: List[dict]
     total: int
     after: Optional[str] = None
 
 
+class PendingTasks:
+    """
+    Keeps track of the tasks sent to the worker pool, so that we can
+    wait for the whole topology to be processed
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.error: Optional[Exception] = None
+        self._condition = threading.Condition()
+
+    def add(self) -> None:
+        with self._condition:
+            self.count += 1
+
+    def done(self, error: Optional[Exception] = None) -> None:
+        with self._condition:
+            self.count -= 1
+            if error and not self.error:
+                self.error = error
+            self._condition.notify_all()
+
+    def wait(self) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: self.count == 0)
+
+
+class Subtree:
+    """
+    Tracks an element until all its descendants have been processed,
+    which can happen in any worker
+    """
+
+    def __init__(
+        self,
+        node: str,
+        fqn: Optional[str],
+        parent: Optional["Subtree"],
+        on_complete: Callable[["Subtree"], None],
+    ):
+        self.node = node
+        self.fqn = fqn
+        self.parent = parent
+        self.on_complete = on_complete
+        self.pending = 1
+        self.failed = False
+        self._lock = threading.Lock()
+        if parent:
+            parent.add()
+
+    def add(self) -> None:
+        with self._lock:
+            self.pending += 1
+
+    def done(self, failed: bool = False) -> None:
+        with self._lock:
+            self.failed = self.failed or failed
+            self.pending -= 1
+            completed = self.pending == 0
+
+        if completed:
+            if not self.failed:
+                self.on_complete(self)
+            if self.parent:
+                self.parent.done(failed=self.failed)
+
+
+def get_element_fqn(element: Union[dict, list]) -> Optional[str]:
+    return element.get("fullyQualifiedName") if isinstance(element, dict) else None
+
+
 class TopologyRunner:
     """
     Simple topology runner
     Each service implementation will read and write the data
+
+    With more than one worker, the elements produced by a node are
+    processed concurrently once their parent has been processed.
+    Each element gets its own copy of its parent's context, so
+    siblings never see each other's state.
+
+    Elements whose subtree has been fully processed are recorded in the
+    journal, so that a resumed run can skip them without listing their
+    children again.
     """
 
     topology: ServiceTopology
     metadata: OpenMetadata
 
-    def process_nodes(self, nodes: List[TopologyNode]) -> None:
+    def __init__(
+        self,
+        workers: int = 1,
+        journal: Optional[Journal] = None,
+        page_size: int = 1000,
+        cache_size: int = 10_000,
+    ):
+        self.workers = workers
+        self.page_size = page_size
+        self.references = EntityReferenceCache(
+            lookup=self.get_entity_by_name, max_size=cache_size
+        )
+        # Stop listing after this many pages, used to sample the collections
+        self.max_pages: Optional[int] = None
+        self.journal = journal or Journal(None, "", "")
+        self.progress = Progress(self.topology)
+        self._local = threading.local()
+        self._root_context = TopologyContext()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.Semaphore] = None
+        self._pending: Optional[PendingTasks] = None
+
+    @property
+    def context(self) -> TopologyContext:
+        """
+        Context of the element being processed by the current thread
+        """
+        return getattr(self._local, "context", None) or self._root_context
+
+    @contextmanager
+    def scoped_context(self, context: TopologyContext):
+        previous = getattr(self._local, "context", None)
+        self._local.context = context
+        try:
+            yield context
+        finally:
+            self._local.context = previous
+
+    @contextmanager
+    def listing_node(self, node: str):
+        """
+        Let list_all_raw_entities know which node its totals belong to
+        """
+        previous = getattr(self._local, "node", None)
+        self._local.node = node
+        try:
+            yield
+        finally:
+            self._local.node = previous
+
+    def produce(self, node: str, producer_fn: Callable) -> Iterable:
+        with self.listing_node(node):
+            elements = iter(producer_fn() or [])
+        while True:
+            with self.listing_node(node):
+                element = next(elements, None)
+            if element is None:
+                return
+            yield element
+
+    def skip_done(
+        self, node: str, element: Union[dict, list]
+    ) -> Optional[Union[dict, list]]:
+        """
+        Remove what the journal has already recorded as done
+        """
+        if isinstance(element, list):
+            todo = [
+                elem
+                for elem in element
+                if not self.journal.is_done(node, get_element_fqn(elem))
+            ]
+            if len(todo) < len(element):
+                self.progress.skipped(node, len(element) - len(todo))
+            return todo or None
+
+        fqn = get_element_fqn(element)
+        if self.journal.is_done(node, fqn):
+            logging.info(f"Skipping {node} [{fqn}], already done")
+            self.progress.skipped(node)
+            return None
+        return element
+
+    def complete_subtree(self, subtree: Subtree) -> None:
+        self.journal.record(subtree.node, subtree.fqn)
+
+    def plan_context(self, node: str, element: Union[dict, list]) -> None:
+        """
+        Fill the context from an element of the input service, as the
+        node processor would with the entity it creates. Lets the planner
+        call the children producers without writing anything.
+        """
+
+    def process_nodes(
+        self, nodes: List[TopologyNode], parent: Optional[Subtree] = None
+    ) -> None:
         for node in nodes:
             logging.info(f"Node [{node}]")
+            node_name = get_topology_node_name(node, self.topology)
             node_producer_fn = getattr(self, node.producer)
             processor_fn = getattr(self, node.processor)
 
@@ -41,12 +243,144 @@ class TopologyRunner:
 
             logging.info(f"Children [{child_nodes}]")
 
-            for element in node_producer_fn() or []:
-                processor_fn(element)
-                self.process_nodes(child_nodes)
+            for element in self.produce(node_name, node_producer_fn):
+                element = self.skip_done(node_name, element)
+                if element is None:
+                    continue
+
+                subtree = Subtree(
+                    node=node_name,
+                    fqn=get_element_fqn(element),
+                    parent=parent,
+                    on_complete=self.complete_subtree,
+                )
+                if self._executor:
+                    if self._pending.error:
+                        subtree.done(failed=True)
+                        return
+                    self._submit(
+                        self.process_element,
+                        processor_fn,
+                        element,
+                        child_nodes,
+                        self.context.copy(),
+                        subtree,
+                    )
+                else:
+                    self.process_element(
+                        processor_fn, element, child_nodes, self.context, subtree
+                    )
+
+    def process_element(
+        self,
+        processor_fn: Callable,
+        element: Union[dict, list],
+        child_nodes: List[TopologyNode],
+        context: TopologyContext,
+        subtree: Subtree,
+    ) -> None:
+        """
+        Process an element and its children under their own context
+        """
+        failed = True
+        try:
+            with self.scoped_context(context):
+                try:
+                    processor_fn(element)
+                except ElementFailed as err:
+                    self.element_failed(subtree, element, err)
+                    return
+                self.progress.processed(
+                    subtree.node, len(element) if isinstance(element, list) else 1
+                )
+                self.process_nodes(child_nodes, parent=subtree)
+            failed = False
+        finally:
+            subtree.done(failed=failed)
+
+    def element_failed(
+        self, subtree: Subtree, element: Union[dict, list], err: ElementFailed
+    ) -> None:
+        """
+        Count what the processor could not recreate. Its children are not
+        processed, and the caller marks its subtree as failed.
+        """
+        name = f" [{subtree.fqn}]" if subtree.fqn else ""
+        logging.error(f"Error processing {subtree.node}{name}: {err}")
+        size = len(element) if isinstance(element, list) else 1
+        self.progress.processed(subtree.node, max(size - err.count, 0))
+        self.progress.failed(subtree.node, err.count)
+
+    def _submit(self, fn: Callable, *args) -> None:
+        """
+        Send the task to the pool if there is a free slot, otherwise run it
+        in the calling thread. Producers never block waiting for a worker,
+        which would deadlock the pool when all the workers are producers
+        waiting for their children.
+        """
+        if not self._slots.acquire(blocking=False):
+            fn(*args)
+            return
+
+        self._pending.add()
+        self._executor.submit(self._run_task, fn, *args)
+
+    def _run_task(self, fn: Callable, *args) -> None:
+        error = None
+        try:
+            fn(*args)
+        except Exception as err:
+            logging.error(f"Error processing the topology [{err}]")
+            error = err
+        finally:
+            self._slots.release()
+            self._pending.done(error)
+
+    def run(self, resume: bool = False) -> None:
+        self.journal.open(resume=resume)
+        try:
+            self.process_topology()
+        except Exception:
+            self.journal.close()
+            raise
+        finally:
+            self.close()
+
+        self.progress.log()
+        self.references.log()
+        failures = self.progress.failures()
+        if failures:
+            # Keep the journal, so that --resume only retries what failed
+            self.journal.close()
+            raise RuntimeError(
+                f"{failures} entities could not be recreated,"
+                " run again with --resume to retry them"
+            )
+        self.journal.close(remove=True)
+
+    def close(self) -> None:
+        """
+        Release what the processors kept for the whole run
+        """
+
+    def process_topology(self) -> None:
+        if self.workers <= 1:
+            self.process_nodes([self.topology.root])
+            return
+
+        logging.info(f"Processing the topology with {self.workers} workers")
+        self._slots = threading.Semaphore(self.workers * 2)
+        self._pending = PendingTasks()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            self._executor = executor
+            try:
+                self.process_nodes([self.topology.root])
+            finally:
+                self._pending.wait()
+                self._executor = None
 
-    def run(self) -> None:
-        self.process_nodes([self.topology.root])
+        if self._pending.error:
+            raise self._pending.error
 
     def list_raw_entities(
         self,
@@ -68,34 +402,96 @@ class TopologyRunner:
             path=f"{suffix}{url_limit}{url_after}{url_fields}", data=params
         )
 
-        entities = [t for t in resp["data"]]
-        total = resp["paging"]["total"]
-        after = resp["paging"]["after"] if "after" in resp["paging"] else None
-        return RawEntityList(entities=entities, total=total, after=after)
+        # The page is already parsed JSON, no need to have pydantic copy
+        # every entity dict again
+        return RawEntityList.construct(
+            entities=resp["data"],
+            total=resp["paging"]["total"],
+            after=resp["paging"].get("after"),
+        )
+
+    def get_entity_by_name(self, entity: Type[T], fqn: str) -> Optional[T]:
+        return self.metadata.get_by_name(entity=entity, fqn=fqn)
+
+    def get_raw_entity_by_name(
+        self,
+        entity: Type[T],
+        fqn: str,
+        fields: Optional[List[str]] = None,
+    ) -> Optional[dict]:
+        """
+        Fetch a single entity by its FQN. Returns None if it does not exist
+        """
+        suffix = self.metadata.get_suffix(entity)
+        url_fields = f"?fields={','.join(fields)}" if fields else ""
+        try:
+            return self.metadata.client.get(
+                path=f"{suffix}/name/{quote(fqn, safe='')}{url_fields}"
+            )
+        except APIError as err:
+            if err.status_code == 404:
+                return None
+            raise
+
+    def find_raw_entity(
+        self,
+        entity: Type[T],
+        name: str,
+        fqn: str,
+        fields: Optional[List[str]] = None,
+        params: Optional[Dict[str, str]] = None,
+    ) -> Iterable[dict]:
+        """
+        Fetch an entity by its FQN, only scanning the collection for its
+        name if the server can't find it, e.g., when the name breaks the
+        FQN rules
+        """
+        try:
+            found = self.get_raw_entity_by_name(entity=entity, fqn=fqn, fields=fields)
+        except Exception as err:
+            logging.warning(f"Error fetching [{fqn}] by name [{err}]")
+            found = None
+
+        if found:
+            yield found
+            return
+
+        logging.info(f"[{fqn}] not found by name, looking for it in the listing")
+        for elem in self.list_all_raw_entities(
+            entity=entity, fields=fields, params=params
+        ):
+            if elem.get("name") == name:
+                yield elem
+                return
 
     def list_all_raw_entities(
         self,
         entity: Type[T],
         fields: Optional[List[str]] = None,
-        limit: int = 1000,
+        limit: Optional[int] = None,
         params: Optional[Dict[str, str]] = None,
-    ) -> RawEntityList:
+    ) -> Iterable[dict]:
         """
-        Helps us paginate over the collection
+        Helps us paginate over the collection. Only one page is kept in
+        memory at a time.
         """
+        limit = limit or self.page_size
 
         # First batch of Entities
         entity_list = self.list_raw_entities(
             entity=entity, fields=fields, limit=limit, params=params
         )
+        self.progress.listed(getattr(self._local, "node", None), entity_list.total)
         for elem in entity_list.entities:
             yield elem
 
+        pages = 1
         after = entity_list.after
-        while after:
+        while after and (not self.max_pages or pages < self.max_pages):
             entity_list = self.list_raw_entities(
                 entity=entity, fields=fields, limit=limit, params=params, after=after
             )
             for elem in entity_list.entities:
                 yield elem
             after = entity_list.after
+            pages += 1
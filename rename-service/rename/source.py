@@ -0,0 +1,69 @@
+"""
+Base for the topology runners recreating a service under a new name
+"""
+from typing import Iterable, List, Optional, Type
+
+from metadata.ingestion.ometa.ometa_api import OpenMetadata
+from pydantic import BaseModel
+
+from rename.helpers import quote_name
+from rename.journal import Journal
+from rename.runner import TopologyRunner
+
+
+class ServiceSource(TopologyRunner):
+    """
+    Reads the input service and recreates it as the output service.
+
+    Its entities are listed with the `service` filter of their collection.
+    """
+
+    service_entity: Type[BaseModel]
+    service_fields: List[str] = ["owner"]
+
+    def __init__(
+        self,
+        input_service_name: str,
+        output_service_name: str,
+        metadata: OpenMetadata,
+        journal_path: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(
+            journal=Journal(journal_path, input_service_name, output_service_name),
+            **kwargs,
+        )
+        self.input_service_name = input_service_name
+        self.output_service_name = output_service_name
+        self.metadata = metadata
+
+    def create_entity(self, request: BaseModel) -> BaseModel:
+        """
+        Create or update an entity, and keep its reference for its children
+        """
+        entity = self.metadata.create_or_update(request)
+        self.references.add(entity)
+        return entity
+
+    def get_services(self) -> Iterable[dict]:
+        yield from self.find_raw_entity(
+            entity=self.service_entity,
+            name=self.input_service_name,
+            fqn=quote_name(self.input_service_name),
+            fields=self.service_fields,
+        )
+
+    def get_service_entities(
+        self, entity: Type[BaseModel], fields: List[str]
+    ) -> Iterable[dict]:
+        yield from self.list_all_raw_entities(
+            entity=entity,
+            fields=fields,
+            params={"service": self.input_service_name},
+        )
+
+    def output_fqn(self, name: str) -> str:
+        """
+        FQN of an entity directly under the output service
+        """
+        return f"{quote_name(self.output_service_name)}.{quote_name(name)}"
@@ -0,0 +1,95 @@
+"""
+Storage Services: service -> locations
+
+OpenMetadata 0.13 has no containers: storage services hold the
+locations of the tables, and have no connection.
+"""
+import logging
+from typing import Iterable, Union
+
+from metadata.generated.schema.api.data.createLocation import CreateLocationRequest
+from metadata.generated.schema.api.services.createStorageService import (
+    CreateStorageServiceRequest,
+)
+from metadata.generated.schema.entity.data.location import Location
+from metadata.generated.schema.entity.services.storageService import StorageService
+
+from rename.async_runner import AsyncTopologyRunner
+from rename.helpers import get_owner, get_tag_label
+from rename.runner import ElementFailed
+from rename.source import ServiceSource
+from rename.topology import ServiceTopology, TopologyNode
+
+STORAGE_SERVICE_FIELDS = ["owner"]
+LOCATION_FIELDS = ["owner", "tags"]
+
+
+class StorageServiceTopology(ServiceTopology):
+    """
+    Defines the hierarchy in Storage Services.
+    service -> location.
+    """
+
+    root = TopologyNode(
+        producer="get_services",
+        processor="create_storage_service",
+        children=["location"],
+    )
+    location = TopologyNode(
+        producer="get_locations",
+        processor="create_location",
+    )
+
+
+class StorageServiceSource(ServiceSource):
+    topology = StorageServiceTopology()
+    service_entity = StorageService
+    service_fields = STORAGE_SERVICE_FIELDS
+
+    def plan_context(self, node: str, element: Union[dict, list]) -> None:
+        if node == "root":
+            self.context.storage_service = StorageService.parse_obj(element)
+
+    def create_storage_service(self, service: dict) -> None:
+        logging.info(f"Processing service {service.get('name')}")
+
+        self.context.storage_service = self.create_entity(
+            CreateStorageServiceRequest(
+                name=self.output_service_name,
+                displayName=service.get("displayName"),
+                description=service.get("description"),
+                owner=get_owner(service),
+                serviceType=service.get("serviceType"),
+            )
+        )
+
+    def get_locations(self) -> Iterable[dict]:
+        yield from self.get_service_entities(entity=Location, fields=LOCATION_FIELDS)
+
+    def create_location(self, location: dict) -> None:
+        logging.info(f"Processing location {location.get('name')}")
+
+        try:
+            self.create_entity(
+                CreateLocationRequest(
+                    name=location.get("name"),
+                    displayName=location.get("displayName"),
+                    description=location.get("description"),
+                    path=location.get("path"),
+                    locationType=location.get("locationType"),
+                    owner=get_owner(location),
+                    tags=get_tag_label(location),
+                    service=self.references.reference_to(self.context.storage_service),
+                )
+            )
+        except Exception as err:
+            logging.error(f"Error creating location from [{location}] due to [{err}]")
+            raise ElementFailed(
+                f"Error creating location {location.get('name')}"
+            ) from err
+
+
+class AsyncStorageServiceSource(StorageServiceSource, AsyncTopologyRunner):
+    """
+    Same topology, processed by the asyncio runner
+    """
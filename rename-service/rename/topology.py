@@ -51,3 +51,14 @@ def get_topology_node(name: str, topology: ServiceTopology) -> TopologyNode:
         raise ValueError(f"{name} node not found in {topology}")
 
     return node
+
+
+def get_topology_node_name(node: TopologyNode, topology: ServiceTopology) -> str:
+    """
+    Fetch the name of a topology node
+    """
+    for name, value in topology.__dict__.items():
+        if value is node:
+            return name
+
+    raise ValueError(f"{node} node not found in {topology}")
@@ -15,6 +15,7 @@ def get_long_description():
 
 base_requirements = {"pydantic", "requests", "openmetadata-ingestion~=0.13"}
 dev = {"isort", "black", "pycln"}
+async_ = {"aiohttp"}
 
 setup(
     name="om-rename",
@@ -32,5 +33,6 @@ setup(
     install_requires=list(base_requirements),
     extras_require={
         "dev": list(dev),
+        "async": list(async_),
     },
 )